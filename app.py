@@ -1,150 +1,263 @@
+import functools
+import os
+import tempfile
+import uuid
+import zipfile
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-st.set_page_config(page_title="Tableau de bord unifié", layout="wide")
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "Antibiotiques 2024",
-    "Autres Antibiotiques",
-    "Phénotypes Staph aureus",
-    "Fiches Bactéries",
-    "Alertes par service"
-])
+from surveillance.alerts import ROLLING_WINDOW, alert_matrix, load_bands, rolling_status, threshold_bands
+from surveillance.charts import threshold_figure
+from surveillance.control import ControlChart, drift_chart, load_chart
+from surveillance.cube import load_resistance_cube
+from surveillance.loaders import (
+    PHENOTYPES,
+    SERVICE_COLUMNS,
+    SERVICE_LOG_PATH,
+    bytes_digest,
+    find_week_column,
+    guess_year,
+    normalize_service_log,
+    percent_columns,
+    phenotype_columns,
+    phenotype_percentages,
+    prepare_weekly,
+    read_table,
+    weekly_columns,
+)
+from surveillance.profiling import finish_run, span, start_run
+from surveillance.report import HAS_KALEIDO, Section, week_span, write_report
+from surveillance.search import CatalogueIndex
+from surveillance.services import WeekServiceIndex, load_service_index
+from surveillance.store import SurveillanceStore, append_tracked
+from surveillance.uploads import UploadCache
+from surveillance.watcher import DROP_DIR, DropFolderWatcher, latest
 
-with tab1:
-    st.header("📌 Antibiotiques 2024")
+st.set_page_config(page_title="Tableau de bord unifié", layout="wide")
 
-# === Onglet 1 : Antibiotiques 2024 ===
-with tab1:
-    st.header("📌 Antibiotiques - Données 2024")
-    uploaded_file_ab = st.file_uploader("📂 Charger un fichier CSV ou Excel", type=["csv", "xlsx"], key="upload_ab")
+ROLLING_LABEL = f"Seuils glissants ({ROLLING_WINDOW} semaines précédentes)"
+store = SurveillanceStore()
+PHENO_PCT_COLS = [f"% {pheno}" for pheno in PHENOTYPES]
+REBUILT_MESSAGE = ("ℹ️ Semaines déjà intégrées ou antérieures à l'historique : "
+                   "les états de suivi ont été recalculés sur tout l'historique.")
+BACT_COLUMNS = ["Category", "Key Antibiotics", "Other Antibiotics", "Phenotype"]
 
-    if uploaded_file_ab is not None:
-        try:
-            if uploaded_file_ab.name.endswith(".csv"):
-                df_ab = pd.read_csv(uploaded_file_ab)
-            else:
-                df_ab = pd.read_excel(uploaded_file_ab)
 
-            df_ab.columns = df_ab.columns.str.strip()
+def persistent_uploader(label, types, key):
+    """file_uploader dont le fichier reste disponible quand on change de panneau.
 
-            if "Week" in df_ab.columns:
-                week_col = "Semaine"
-            else:
-                st.error("❌ Colonne 'Week' introuvable dans le fichier importé.")
-                st.write("Colonnes trouvées :", list(df_ab.columns))
-                st.stop()
+    Un widget non affiché perd son état ; le fichier est donc aussi conservé
+    dans la session et n'est oublié que si l'utilisateur le retire.
+    """
+    kept = f"{key}_kept"
 
-            df_ab = df_ab[df_ab[week_col].apply(lambda x: str(x).isdigit())]
-            df_ab[week_col] = df_ab[week_col].astype(int)
-            ab_cols = [col for col in df_ab.columns if col.startswith('%')]
+    def remember():
+        st.session_state[kept] = st.session_state[key]
 
-            selected_ab = st.selectbox("Sélectionner un antibiotique", ab_cols, key="ab2024")
-            min_week, max_week = df_ab[week_col].min(), df_ab[week_col].max()
-            week_range = st.slider("Plage de semaines", min_week, max_week, (min_week, max_week), key="range_ab2024")
+    uploaded = st.file_uploader(label, type=types, key=key, on_change=remember)
+    return uploaded if uploaded is not None else st.session_state.get(kept)
 
-            df_filtered = df_ab[(df_ab[week_col] >= week_range[0]) & (df_ab[week_col] <= week_range[1])]
-            values = pd.to_numeric(df_filtered[selected_ab], errors='coerce').dropna()
-            q1, q3 = np.percentile(values, [25, 75])
-            iqr = q3 - q1
-            lower, upper = max(q1 - 1.5 * iqr, 0), q3 + 1.5 * iqr
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df_filtered[week_col], y=df_filtered[selected_ab], mode='lines+markers', name=selected_ab))
-            fig.add_trace(go.Scatter(x=df_filtered[week_col], y=[upper]*len(df_filtered), mode='lines', name="Seuil haut", line=dict(dash='dash')))
-            fig.add_trace(go.Scatter(x=df_filtered[week_col], y=[lower]*len(df_filtered), mode='lines', name="Seuil bas", line=dict(dash='dot')))
-            fig.update_layout(yaxis=dict(range=[0, 30]), xaxis_title="Semaine", yaxis_title="Résistance (%)")
-            st.plotly_chart(fig, use_container_width=True)
 
-            nb_tests = df_filtered[selected_ab].count()
-            moyenne = df_filtered[selected_ab].mean()
-            semaine_pic = df_filtered.loc[df_filtered[selected_ab].idxmax(), week_col]
+def data_year(key, source_name, default):
+    """Année ISO choisie pour ce fichier, conservée hors widget pour survivre aux changements de panneau."""
+    saved = st.session_state.get(f"data_year_{key}")
+    return saved[1] if saved is not None and saved[0] == source_name else default
 
-            st.markdown("### 🧾 Résumé")
-            st.write(f"🔢 **Nombre de semaines analysées** : {nb_tests}")
-            st.write(f"📊 **Moyenne de résistance** : {moyenne:.2f} %")
-            st.write(f"💥 **Semaine avec le pic de résistance** : Semaine {semaine_pic}")
-
-            try:
-                df_service = pd.read_excel("staph aureus hebdomadaire excel.xlsx")
-                df_service['DATE_ENTREE'] = pd.to_datetime(df_service['DATE_ENTREE'], errors='coerce')
-                df_service['Week'] = df_service['DATE_ENTREE'].dt.isocalendar().week
-                services_pic = df_service[df_service['Week'] == semaine_pic]['LIBELLE_DEMANDEUR'].dropna().unique()
-                if len(services_pic) > 0:
-                    st.markdown(f"### 🏥 **Services présents la semaine du pic (S{semaine_pic}) :**")
-                    for s in services_pic:
-                        st.write(f"🔹 {s}")
-                else:
-                    st.info("Aucun service enregistré cette semaine-là.")
-            except:
-                st.warning("⚠️ Impossible d'afficher les services de la semaine du pic.")
 
-            last_val = df_filtered[selected_ab].dropna().iloc[-1]
-            if last_val > upper:
-                st.error(f"🚨 Alerte : la résistance est élevée cette semaine ({last_val:.2f} %)")
-                try:
-                    semaine_actuelle = df_filtered[week_col].iloc[-1]
-                    services = df_service[df_service['Week'] == semaine_actuelle]['LIBELLE_DEMANDEUR'].dropna().unique()
-                    if len(services) > 0:
-                        st.markdown("### 🏥 **Services concernés cette semaine :**")
-                        for s in services:
-                            st.write(f"🔸 {s}")
-                    else:
-                        st.info("Aucun service enregistré cette semaine.")
-                except:
-                    st.warning("⚠️ Impossible d'afficher les services concernés.")
-            elif last_val < lower:
-                st.warning(f"⚠️ Résistance anormalement basse cette semaine ({last_val:.2f} %)")
-            else:
-                st.success(f"✅ Résistance dans la norme cette semaine ({last_val:.2f} %)")
-        except Exception as e:
-            st.error(f"Erreur lors de la lecture du fichier : {str(e)}")
-    else:
-        st.info("📥 Veuillez charger un fichier pour afficher les données.")
+def year_input(key, source_name, default):
+    """Saisie de l'année des données ; la valeur choisie est gardée par data_year."""
+    def remember():
+        st.session_state[f"data_year_{key}"] = (source_name, st.session_state[f"year_{key}"])
 
+    return st.number_input("Année ISO des données", 2000, 2100, data_year(key, source_name, default),
+                           key=f"year_{key}", on_change=remember)
 
-# === Onglet 2 : Autres Antibiotiques ===
-with tab2:
-    st.header("🧪 Autres Antibiotiques - Staph aureus")
-    uploaded_file_other = st.file_uploader("📂 Charger un fichier pour Autres Antibiotiques", type=["csv", "xlsx"], key="upload_other")
 
-    if uploaded_file_other is not None:
+def profiled(panel):
+    """Chronomètre chaque exécution du panneau ; détail affiché en mode profilage."""
+    @functools.wraps(panel)
+    def run_panel(*args, **kwargs):
+        session = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+        run = start_run(st.session_state.get("panel", panel.__name__), session)
         try:
-            if uploaded_file_other.name.endswith(".csv"):
-                df_other = pd.read_csv(uploaded_file_other)
+            panel(*args, **kwargs)
+        finally:
+            finish_run(run)
+        if st.session_state.get("debug_profile"):
+            # la barre latérale n'est pas accessible depuis un fragment : le détail suit le panneau
+            with st.expander(f"⏱️ Profil de ce rafraîchissement : {run.total_ms:.0f} ms", expanded=True):
+                st.dataframe(pd.DataFrame(run.table()), use_container_width=True)
+                cache = upload_cache().stats()
+                st.caption(f"🗃️ Cache des fichiers : {cache['entrées']} entrées, "
+                           f"{cache['mémoire_mo']} / {cache['budget_mo']} Mo, "
+                           f"{cache['succès']} succès, {cache['échecs']} échecs, {cache['évictions']} évictions")
+    return run_panel
+
+
+def read_upload(uploaded, columns):
+    """Lecture par blocs des seules colonnes utiles, avec barre de progression."""
+    uploaded.seek(0)
+    bar = st.progress(0.0, text=f"Lecture de {uploaded.name}…")
+    df = read_table(uploaded, uploaded.name, columns=columns, progress=bar.progress)
+    bar.empty()
+    return df
+
+
+@st.cache_resource(show_spinner=False)
+def upload_cache():
+    """Cache des fichiers chargés, commun à toutes les sessions du processus."""
+    return UploadCache()
+
+
+def upload_digest(uploaded):
+    """Empreinte du fichier chargé, calculée une seule fois par fichier dans la session."""
+    file_id = getattr(uploaded, "file_id", None)
+    if file_id is None:
+        return bytes_digest(uploaded.getvalue())
+    digests = st.session_state.setdefault("upload_digests", {})
+    if file_id not in digests:
+        digests[file_id] = bytes_digest(uploaded.getvalue())
+    return digests[file_id]
+
+
+def cached_upload(uploaded, stage, build):
+    """Résultat de `build()` pour ce contenu de fichier, calculé une fois pour toutes les sessions."""
+    with span(f"cache_{stage}"):
+        return upload_cache().get((upload_digest(uploaded), stage), build)
+
+
+def cached_drop(dropped, stage, build):
+    """Comme cached_upload, pour un export précalculé du dossier de dépôt."""
+    with span(f"cache_depot_{stage}"):
+        return upload_cache().get((dropped.meta["digest"], f"depot_{stage}"), build)
+
+
+@st.cache_resource(show_spinner=False)
+def drop_watcher():
+    """Précalcul du dossier de dépôt, lancé une seule fois par processus serveur."""
+    return DropFolderWatcher(store=store).start()
+
+
+def dropped_file(dataset):
+    """Dernier export précalculé pour ce jeu de données (None sinon), signalé par un bandeau."""
+    dropped = latest(dataset)
+    if dropped is not None:
+        st.caption(f"📦 Données précalculées du dossier de dépôt : {dropped.meta['source']} "
+                   f"(analysées le {dropped.meta['computed_at']}). Charger un fichier pour les remplacer.")
+    return dropped
+
+
+def load_weekly(uploaded):
+    """Tableau hebdomadaire lu, colonnes nettoyées et semaines triées ; colonne semaine ou None."""
+    with span("lecture") as timing:
+        df = read_upload(uploaded, weekly_columns)
+        timing["rows"] = len(df)
+    df.columns = df.columns.str.strip()
+    week_col = find_week_column(df.columns)
+    if week_col is not None:
+        with span("semaines", rows=len(df)):
+            df = prepare_weekly(df, week_col)
+    return df, week_col
+
+
+def load_phenotypes(uploaded):
+    """Comptes de phénotypes lus avec leurs pourcentages hebdomadaires."""
+    with span("lecture") as timing:
+        df = read_upload(uploaded, phenotype_columns)
+        timing["rows"] = len(df)
+    df.columns = df.columns.str.strip()
+    with span("pourcentages", rows=len(df)):
+        return phenotype_percentages(df)
+
+
+def load_services(uploaded):
+    """Journal des services normalisé et son index par semaine ; index None sans DATE_ENTREE."""
+    with span("lecture") as timing:
+        df = read_upload(uploaded, SERVICE_COLUMNS)
+        timing["rows"] = len(df)
+    df.columns = df.columns.str.strip()
+    if "DATE_ENTREE" not in df.columns:
+        return df, None
+    with span("dates_semaines", rows=len(df)):
+        df = normalize_service_log(df)
+    with span("index_services", rows=len(df)):
+        return df, WeekServiceIndex.from_service_log(df)
+
+
+def drift_panel(dataset, rows, cols):
+    """Derniers signaux EWMA / CUSUM : carte sauvegardée de l'historique, avancée des semaines plus récentes de `rows`."""
+    saved = load_chart(dataset)
+    chart = drift_chart(saved, rows, cols)
+    if saved is not None and saved.last_key is not None:
+        year, week = saved.last_key
+        st.caption(f"Carte reprise de l'historique (jusqu'à {year}-S{week:02d}), "
+                   "complétée par les semaines plus récentes du fichier.")
+    st.dataframe(chart.signals(cols), use_container_width=True)
+
+
+# === Onglets 1 et 2 : tableaux hebdomadaires d'antibiotiques ===
+@st.fragment
+@profiled
+def weekly_antibiotics_panel(title, upload_label, upload_key, key, dataset):
+    st.header(title)
+    uploaded_file_ab = persistent_uploader(upload_label, ["csv", "xlsx"], upload_key)
+    dropped = dropped_file(dataset) if uploaded_file_ab is None else None
+
+    if uploaded_file_ab is not None or dropped is not None:
+        try:
+            if dropped is not None:
+                df_ab, week_col, source_name = dropped.table, dropped.meta["week_col"], dropped.meta["source"]
             else:
-                df_other = pd.read_excel(uploaded_file_other)
+                df_ab, week_col = cached_upload(uploaded_file_ab, "hebdomadaire", lambda: load_weekly(uploaded_file_ab))
+                source_name = uploaded_file_ab.name
+            if week_col is None:
+                st.error("❌ Colonne 'Week' introuvable dans le fichier importé.")
+                st.write("Colonnes trouvées :", list(df_ab.columns))
+                return
 
-            df_other.columns = df_other.columns.str.strip()
+            ab_cols = percent_columns(df_ab)
 
-            if "Week" in df_other.columns:
-                week_col = "Week"
-            else:
-                st.error("❌ Colonne 'Week' introuvable dans le fichier importé.")
-                st.write("Colonnes trouvées :", list(df_other.columns))
-                st.stop()
-
-            df_other = df_other[df_other[week_col].apply(lambda x: str(x).isdigit())]
-            df_other[week_col] = df_other[week_col].astype(int)
-            ab_cols = [col for col in df_other.columns if col.startswith('%')]
-
-            selected_ab = st.selectbox("Sélectionner un antibiotique", ab_cols, key="ab_other")
-            min_week, max_week = df_other[week_col].min(), df_other[week_col].max()
-            week_range = st.slider("Plage de semaines", min_week, max_week, (min_week, max_week), key="range_ab_other")
-
-            df_filtered = df_other[(df_other[week_col] >= week_range[0]) & (df_other[week_col] <= week_range[1])]
-            values = pd.to_numeric(df_filtered[selected_ab], errors='coerce').dropna()
-            q1, q3 = np.percentile(values, [25, 75])
-            iqr = q3 - q1
-            lower, upper = max(q1 - 1.5 * iqr, 0), q3 + 1.5 * iqr
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df_filtered[week_col], y=df_filtered[selected_ab], mode='lines+markers', name=selected_ab))
-            fig.add_trace(go.Scatter(x=df_filtered[week_col], y=[upper]*len(df_filtered), mode='lines', name="Seuil haut", line=dict(dash='dash')))
-            fig.add_trace(go.Scatter(x=df_filtered[week_col], y=[lower]*len(df_filtered), mode='lines', name="Seuil bas", line=dict(dash='dot')))
-            fig.update_layout(yaxis=dict(range=[0, 30]), xaxis_title="Semaine", yaxis_title="Résistance (%)")
-            st.plotly_chart(fig, use_container_width=True)
+            service_year = load_service_index(SERVICE_LOG_PATH).main_year() if os.path.exists(SERVICE_LOG_PATH) else None
+            default_year = guess_year(source_name, service_year)
+            data_year = year_input(key, source_name, default_year)
+            rows = df_ab.assign(Year=data_year, Week=df_ab[week_col])
+            if st.button("💾 Ajouter à l'historique", key=f"store_{key}"):
+                rebuilt = append_tracked(store, dataset, rows, ab_cols)
+                st.success(f"Semaines {data_year} enregistrées dans l'historique.")
+                if rebuilt:
+                    st.info(REBUILT_MESSAGE)
+
+            selected_ab = st.selectbox("Sélectionner un antibiotique", ab_cols, key=f"ab_{key}")
+            min_week, max_week = df_ab[week_col].min(), df_ab[week_col].max()
+            week_range = st.slider("Plage de semaines", min_week, max_week, (min_week, max_week), key=f"range_{key}")
+            rolling = st.checkbox(ROLLING_LABEL, value=True, key=f"rolling_{key}")
+
+            df_filtered = df_ab[(df_ab[week_col] >= week_range[0]) & (df_ab[week_col] <= week_range[1])]
+            with span("seuils", rows=len(df_ab)):
+                series = pd.to_numeric(df_ab[selected_ab], errors='coerce')
+                lower, upper = threshold_bands(series, df_filtered.index, rolling)
+
+            with st.expander("📋 Matrice d'alertes - tous les antibiotiques"):
+                with span("matrice_alertes", rows=len(df_filtered) * len(ab_cols)):
+                    # verdict glissant jugé comme la vue principale : historique jusqu'à la fin de la plage
+                    shown = df_ab.iloc[: df_ab.index.get_loc(df_filtered.index[-1]) + 1]
+                    matrix = alert_matrix(df_filtered, week_col, ab_cols).join(rolling_status(shown, ab_cols))
+                    st.dataframe(matrix, use_container_width=True)
+            with st.expander("📈 Détection de dérive (EWMA / CUSUM) - tous les antibiotiques"):
+                with span("ewma_cusum", rows=len(df_ab) * len(ab_cols)):
+                    drift_panel(dataset, rows, ab_cols)
+            if dropped is not None and dropped.results is not None:
+                with st.expander("🗂️ Verdicts précalculés (toutes les semaines)"):
+                    st.dataframe(dropped.results, use_container_width=True)
+
+            overlay = st.multiselect("Superposer d'autres antibiotiques", [col for col in ab_cols if col != selected_ab], key=f"overlay_{key}")
+            plotted = {col: pd.to_numeric(df_filtered[col], errors='coerce') for col in [selected_ab, *overlay]}
+            with span("figure", rows=len(df_filtered) * len(plotted)):
+                fig = threshold_figure(df_filtered[week_col], plotted, lower, upper, y_range=[0, 30])
+            with span("rendu_plotly"):
+                st.plotly_chart(fig, use_container_width=True)
 
             nb_tests = df_filtered[selected_ab].count()
             moyenne = df_filtered[selected_ab].mean()
@@ -156,185 +269,93 @@ with tab2:
             st.write(f"💥 **Semaine avec le pic de résistance** : Semaine {semaine_pic}")
 
             try:
-                df_service = pd.read_excel("staph aureus hebdomadaire excel.xlsx")
-                df_service['DATE_ENTREE'] = pd.to_datetime(df_service['DATE_ENTREE'], errors='coerce')
-                df_service['Week'] = df_service['DATE_ENTREE'].dt.isocalendar().week
-                services_pic = df_service[df_service['Week'] == semaine_pic]['LIBELLE_DEMANDEUR'].dropna().unique()
+                with span("services"):
+                    service_index = load_service_index(SERVICE_LOG_PATH)
+                    services_pic = service_index.lookup(semaine_pic, data_year)
                 if len(services_pic) > 0:
                     st.markdown(f"### 🏥 **Services présents la semaine du pic (S{semaine_pic}) :**")
-                    for s in services_pic:
-                        st.write(f"🔹 {s}")
+                    for s, n in services_pic.items():
+                        st.write(f"🔹 {s} ({n} isolats)")
                 else:
                     st.info("Aucun service enregistré cette semaine-là.")
             except:
                 st.warning("⚠️ Impossible d'afficher les services de la semaine du pic.")
 
-            last_val = df_filtered[selected_ab].dropna().iloc[-1]
-            if last_val > upper:
+            last_idx = series.loc[df_filtered.index].last_valid_index()
+            last_val = series[last_idx]
+            if pd.isna(upper[last_idx]):
+                st.info(f"ℹ️ Historique insuffisant pour juger cette semaine ({last_val:.2f} %)")
+            elif last_val > upper[last_idx]:
                 st.error(f"🚨 Alerte : la résistance est élevée cette semaine ({last_val:.2f} %)")
                 try:
                     semaine_actuelle = df_filtered[week_col].iloc[-1]
-                    services = df_service[df_service['Week'] == semaine_actuelle]['LIBELLE_DEMANDEUR'].dropna().unique()
+                    services = service_index.lookup(semaine_actuelle, data_year)
                     if len(services) > 0:
                         st.markdown("### 🏥 **Services concernés cette semaine :**")
-                        for s in services:
-                            st.write(f"🔸 {s}")
+                        for s, n in services.items():
+                            st.write(f"🔸 {s} ({n} isolats)")
                     else:
                         st.info("Aucun service enregistré cette semaine.")
                 except:
                     st.warning("⚠️ Impossible d'afficher les services concernés.")
-            elif last_val < lower:
+            elif last_val < lower[last_idx]:
                 st.warning(f"⚠️ Résistance anormalement basse cette semaine ({last_val:.2f} %)")
             else:
                 st.success(f"✅ Résistance dans la norme cette semaine ({last_val:.2f} %)")
-        except Exception as e:
-            st.error(f"Erreur lors de la lecture du fichier : {str(e)}")
-    else:
-        st.info("📥 Veuillez charger un fichier pour afficher les données.")
-# === Onglet 3 : Phénotypes Staph aureus ===
-with tab3:
-    st.header("🧬 Phénotypes - Staph aureus")
-    uploaded_file_pheno = st.file_uploader("📂 Charger un fichier pour Phénotypes", type=["csv", "xlsx"], key="upload_pheno")
-
-    if uploaded_file_pheno is not None:
-        try:
-            if uploaded_file_pheno.name.endswith(".csv"):
-                df_pheno = pd.read_csv(uploaded_file_pheno)
-            else:
-                df_pheno = pd.read_excel(uploaded_file_pheno)
-
-            df_pheno.columns = df_pheno.columns.str.strip()
-
-            df_pheno["week"] = pd.to_datetime(df_pheno["week"], errors="coerce")
-            df_pheno = df_pheno.dropna(subset=["week"])
-            df_pheno["Week"] = df_pheno["week"].dt.date
-
-            phenos = ["MRSA", "Other", "VRSA", "Wild"]
-            df_pheno["Total"] = df_pheno[phenos].sum(axis=1)
-            for pheno in phenos:
-                df_pheno[f"% {pheno}"] = (df_pheno[pheno] / df_pheno["Total"]) * 100
-
-            selected_pheno = st.selectbox("Sélectionner un phénotype", phenos)
-            min_date, max_date = df_pheno["Week"].min(), df_pheno["Week"].max()
-            date_range = st.slider("Plage de semaines", min_date, max_date, (min_date, max_date))
 
-            filtered_pheno = df_pheno[(df_pheno["Week"] >= date_range[0]) & (df_pheno["Week"] <= date_range[1])]
-            pct_col = f"% {selected_pheno}"
-            values = filtered_pheno[pct_col].dropna()
-            q1, q3 = np.percentile(values, [25, 75])
-            iqr = q3 - q1
-            lower, upper = max(q1 - 1.5 * iqr, 0), q3 + 1.5 * iqr
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=filtered_pheno["Week"], y=filtered_pheno[pct_col],
-                                     mode='lines+markers', name=pct_col))
-            fig.add_trace(go.Scatter(x=filtered_pheno["Week"], y=[upper]*len(filtered_pheno),
-                                     mode='lines', name="Seuil haut", line=dict(dash='dash')))
-            fig.add_trace(go.Scatter(x=filtered_pheno["Week"], y=[lower]*len(filtered_pheno),
-                                     mode='lines', name="Seuil bas", line=dict(dash='dot')))
-            fig.update_layout(yaxis=dict(range=[0, 100]), xaxis_title="Semaine", yaxis_title="Résistance (%)")
-            st.plotly_chart(fig, use_container_width=True)
-
-            nb_tests = filtered_pheno[pct_col].count()
-            moyenne = filtered_pheno[pct_col].mean()
-            semaine_pic = filtered_pheno.loc[filtered_pheno[pct_col].idxmax(), "Week"]
-
-            st.markdown("### 🧾 Résumé")
-            st.write(f"🔢 **Nombre de semaines analysées** : {nb_tests}")
-            st.write(f"📊 **Moyenne de {selected_pheno}** : {moyenne:.2f} %")
-            st.write(f"💥 **Semaine avec le pic de {selected_pheno}** : {semaine_pic}")
-
-            last_val = filtered_pheno[pct_col].dropna().iloc[-1]
-            if last_val > upper:
-                st.error(f"🚨 Alerte : taux élevé de {selected_pheno} cette semaine ({last_val:.2f} %)")
-            elif last_val < lower:
-                st.warning(f"⚠️ Taux anormalement bas de {selected_pheno} cette semaine ({last_val:.2f} %)")
-            else:
-                st.success(f"✅ Taux de {selected_pheno} dans la norme cette semaine ({last_val:.2f} %)")
+            history_years = store.years(dataset)
+            if history_years:
+                with st.expander("📚 Historique multi-années"):
+                    first, last = st.select_slider("Années", history_years, (history_years[0], history_years[-1]), key=f"history_{key}")
+                    history = store.read(dataset, (first, 1), (last, 53), columns=[selected_ab])
+                    history_x = history["Year"].astype(str) + "-S" + history["Week"].astype(str).str.zfill(2)
+                    st.line_chart(pd.Series(history[selected_ab].to_numpy(), index=history_x, name=selected_ab))
+                    bands = load_bands(dataset)
+                    if bands is not None:
+                        st.markdown("**Bandes glissantes de l'historique (seuils de la semaine suivante)**")
+                        st.dataframe(bands.status(), use_container_width=True)
         except Exception as e:
             st.error(f"Erreur lors de la lecture du fichier : {str(e)}")
     else:
         st.info("📥 Veuillez charger un fichier pour afficher les données.")
 
 
-# === Onglet 4 : Fiches Bactéries ===
-with tab4:
-    st.header("🧫 Détail des bactéries à étudier")
-    uploaded_file_bact = st.file_uploader("📂 Charger un fichier de bactéries à étudier", type=["xlsx"], key="upload_bact")
-
-    if uploaded_file_bact is not None:
-        try:
-            df_bact = pd.read_excel(uploaded_file_bact)
-            df_bact.columns = df_bact.columns.str.strip()
-
-            search = st.text_input("🔍 Rechercher une bactérie :", "", key="search_bact")
-            filtered_df = df_bact[df_bact["Category"].str.contains(search, case=False, na=False)]
-
-            st.subheader("📋 Liste des bactéries")
-            st.dataframe(filtered_df[["Category", "Key Antibiotics"]])
-
-            if not filtered_df.empty:
-                selected = st.selectbox("📌 Sélectionner une bactérie :", filtered_df["Category"].unique(), key="select_bact")
-                details = df_bact[df_bact["Category"] == selected].iloc[0]
-                st.markdown(f"## 🧬 Détails : {selected}")
-
-                st.write("**🔑 Key Antibiotics**")
-                st.write(details["Key Antibiotics"])
-
-                st.write("**💊 Other Antibiotics**")
-                st.write(details["Other Antibiotics"])
-
-                st.write("**🧬 Phénotype**")
-                st.write(details["Phenotype"])
-            else:
-                st.info("Aucune bactérie ne correspond à votre recherche.")
-        except Exception as e:
-            st.error(f"Erreur lors de la lecture du fichier : {str(e)}")
-    else:
-        st.info("📥 Veuillez charger un fichier pour afficher les données.")
 # === Onglet 3 : Phénotypes Staph aureus ===
-with tab3:
+@st.fragment
+@profiled
+def phenotypes_panel():
     st.header("🧬 Phénotypes - Staph aureus")
-    uploaded_file_pheno = st.file_uploader("📂 Charger un fichier pour Phénotypes", type=["csv", "xlsx"], key="upload_pheno")
+    uploaded_file_pheno = persistent_uploader("📂 Charger un fichier pour Phénotypes", ["csv", "xlsx"], "upload_pheno")
+    dropped = dropped_file("phenotypes") if uploaded_file_pheno is None else None
 
-    if uploaded_file_pheno is not None:
+    if uploaded_file_pheno is not None or dropped is not None:
         try:
-            if uploaded_file_pheno.name.endswith(".csv"):
-                df_pheno = pd.read_csv(uploaded_file_pheno)
+            if dropped is not None:
+                df_pheno = dropped.table
             else:
-                df_pheno = pd.read_excel(uploaded_file_pheno)
-
-            df_pheno.columns = df_pheno.columns.str.strip()
-
-            df_pheno["week"] = pd.to_datetime(df_pheno["week"], errors="coerce")
-            df_pheno = df_pheno.dropna(subset=["week"])
-            df_pheno["Week"] = df_pheno["week"].dt.date
-
-            phenos = ["MRSA", "Other", "VRSA", "Wild"]
-            df_pheno["Total"] = df_pheno[phenos].sum(axis=1)
-            for pheno in phenos:
-                df_pheno[f"% {pheno}"] = (df_pheno[pheno] / df_pheno["Total"]) * 100
-
-            selected_pheno = st.selectbox("Sélectionner un phénotype", phenos)
+                df_pheno = cached_upload(uploaded_file_pheno, "phenotypes", lambda: load_phenotypes(uploaded_file_pheno))
+            if st.button("💾 Ajouter à l'historique", key="store_pheno"):
+                iso = pd.to_datetime(df_pheno["week"]).dt.isocalendar()
+                rows = df_pheno.assign(Year=iso["year"].astype(int), Week=iso["week"].astype(int))
+                rebuilt = append_tracked(store, "phenotypes", rows, PHENO_PCT_COLS)
+                st.success("Semaines enregistrées dans l'historique.")
+                if rebuilt:
+                    st.info(REBUILT_MESSAGE)
+
+            selected_pheno = st.selectbox("Sélectionner un phénotype", PHENOTYPES, key="select_pheno")
             min_date, max_date = df_pheno["Week"].min(), df_pheno["Week"].max()
-            date_range = st.slider("Plage de semaines", min_date, max_date, (min_date, max_date))
+            date_range = st.slider("Plage de semaines", min_date, max_date, (min_date, max_date), key="range_pheno")
+            rolling = st.checkbox(ROLLING_LABEL, value=True, key="rolling_pheno")
 
             filtered_pheno = df_pheno[(df_pheno["Week"] >= date_range[0]) & (df_pheno["Week"] <= date_range[1])]
             pct_col = f"% {selected_pheno}"
-            values = filtered_pheno[pct_col].dropna()
-            q1, q3 = np.percentile(values, [25, 75])
-            iqr = q3 - q1
-            lower, upper = max(q1 - 1.5 * iqr, 0), q3 + 1.5 * iqr
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=filtered_pheno["Week"], y=filtered_pheno[pct_col],
-                                     mode='lines+markers', name=pct_col))
-            fig.add_trace(go.Scatter(x=filtered_pheno["Week"], y=[upper]*len(filtered_pheno),
-                                     mode='lines', name="Seuil haut", line=dict(dash='dash')))
-            fig.add_trace(go.Scatter(x=filtered_pheno["Week"], y=[lower]*len(filtered_pheno),
-                                     mode='lines', name="Seuil bas", line=dict(dash='dot')))
-            fig.update_layout(yaxis=dict(range=[0, 100]), xaxis_title="Semaine", yaxis_title="Résistance (%)")
-            st.plotly_chart(fig, use_container_width=True)
+            with span("seuils", rows=len(df_pheno)):
+                lower, upper = threshold_bands(df_pheno[pct_col], filtered_pheno.index, rolling)
+
+            with span("figure", rows=len(filtered_pheno)):
+                fig = threshold_figure(filtered_pheno["Week"], {pct_col: filtered_pheno[pct_col]}, lower, upper, y_range=[0, 100])
+            with span("rendu_plotly"):
+                st.plotly_chart(fig, use_container_width=True)
 
             nb_tests = filtered_pheno[pct_col].count()
             moyenne = filtered_pheno[pct_col].mean()
@@ -345,13 +366,34 @@ with tab3:
             st.write(f"📊 **Moyenne de {selected_pheno}** : {moyenne:.2f} %")
             st.write(f"💥 **Semaine avec le pic de {selected_pheno}** : {semaine_pic}")
 
-            last_val = filtered_pheno[pct_col].dropna().iloc[-1]
-            if last_val > upper:
+            last_idx = filtered_pheno[pct_col].last_valid_index()
+            last_val = df_pheno.loc[last_idx, pct_col]
+            if pd.isna(upper[last_idx]):
+                st.info(f"ℹ️ Historique insuffisant pour juger le taux de {selected_pheno} ({last_val:.2f} %)")
+            elif last_val > upper[last_idx]:
                 st.error(f"🚨 Alerte : taux élevé de {selected_pheno} cette semaine ({last_val:.2f} %)")
-            elif last_val < lower:
+            elif last_val < lower[last_idx]:
                 st.warning(f"⚠️ Taux anormalement bas de {selected_pheno} cette semaine ({last_val:.2f} %)")
             else:
                 st.success(f"✅ Taux de {selected_pheno} dans la norme cette semaine ({last_val:.2f} %)")
+
+            st.markdown("### 📈 Détection de dérive (EWMA / CUSUM)")
+            with span("ewma_cusum", rows=len(df_pheno) * len(PHENO_PCT_COLS)):
+                iso = pd.to_datetime(df_pheno["week"]).dt.isocalendar()
+                drift_panel("phenotypes", df_pheno.assign(Year=iso["year"], Week=iso["week"]), PHENO_PCT_COLS)
+                # courbe EWMA du fichier affiché, calculée une fois par contenu
+                build = lambda: ControlChart(PHENO_PCT_COLS).run(df_pheno, PHENO_PCT_COLS)
+                if dropped is not None:
+                    drift = cached_drop(dropped, "ewma_cusum", build)
+                else:
+                    drift = cached_upload(uploaded_file_pheno, "ewma_cusum", build)
+            if dropped is not None and dropped.results is not None:
+                with st.expander("🗂️ Verdicts précalculés (tous les phénotypes)"):
+                    st.dataframe(dropped.results, use_container_width=True)
+            drift = drift.loc[filtered_pheno.index]
+            fig = threshold_figure(filtered_pheno["Week"], {f"EWMA {pct_col}": drift[("ewma", pct_col)]},
+                                   upper=drift[("ewma_haut", pct_col)], y_title="EWMA (%)")
+            st.plotly_chart(fig, use_container_width=True)
         except Exception as e:
             st.error(f"Erreur lors de la lecture du fichier : {str(e)}")
     else:
@@ -359,24 +401,32 @@ with tab3:
 
 
 # === Onglet 4 : Fiches Bactéries ===
-with tab4:
+@st.fragment
+@profiled
+def bacteria_panel():
     st.header("🧫 Détail des bactéries à étudier")
-    uploaded_file_bact = st.file_uploader("📂 Charger un fichier de bactéries à étudier", type=["xlsx"], key="upload_bact")
+    uploaded_file_bact = persistent_uploader("📂 Charger un fichier de bactéries à étudier", ["xlsx"], "upload_bact")
+    dropped = dropped_file("bacteries") if uploaded_file_bact is None else None
 
-    if uploaded_file_bact is not None:
+    if uploaded_file_bact is not None or dropped is not None:
         try:
-            df_bact = pd.read_excel(uploaded_file_bact)
-            df_bact.columns = df_bact.columns.str.strip()
+            if dropped is not None:
+                catalogue = cached_drop(dropped, "catalogue", lambda: CatalogueIndex(dropped.table))
+            else:
+                catalogue = cached_upload(uploaded_file_bact, "catalogue",
+                                          lambda: CatalogueIndex(read_upload(uploaded_file_bact, BACT_COLUMNS)))
 
             search = st.text_input("🔍 Rechercher une bactérie :", "", key="search_bact")
-            filtered_df = df_bact[df_bact["Category"].str.contains(search, case=False, na=False)]
+            with span("recherche") as timing:
+                hits = catalogue.search(search)
+                timing["rows"] = len(hits)
 
             st.subheader("📋 Liste des bactéries")
-            st.dataframe(filtered_df[["Category", "Key Antibiotics"]])
+            st.dataframe(pd.DataFrame([catalogue.get(c) for c in hits], columns=["Category", "Key Antibiotics"]))
 
-            if not filtered_df.empty:
-                selected = st.selectbox("📌 Sélectionner une bactérie :", filtered_df["Category"].unique(), key="select_bact")
-                details = df_bact[df_bact["Category"] == selected].iloc[0]
+            if hits:
+                selected = st.selectbox("📌 Sélectionner une bactérie :", hits, key="select_bact")
+                details = catalogue.get(selected)
                 st.markdown(f"## 🧬 Détails : {selected}")
 
                 st.write("**🔑 Key Antibiotics**")
@@ -393,50 +443,44 @@ with tab4:
             st.error(f"Erreur lors de la lecture du fichier : {str(e)}")
     else:
         st.info("📥 Veuillez charger un fichier pour afficher les données.")
-st.set_page_config(page_title="Tableau de bord unifié", layout="wide")
-
-# Déclaration des onglets
-import streamlit as st
-import pandas as pd
-
-# Onglets de navigation
 
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "Antibiotiques 2024",
-    "Autres Antibiotiques",
-    "Phénotypes Staph aureus",
-    "Fiches Bactéries",
-    "Alertes par service"
-])
-
 # === Onglet 5 : Alertes par service ===
-with tab5:
+@st.fragment
+@profiled
+def services_panel():
     st.header("⚠️ Alertes par service")
-    uploaded_file_service = st.file_uploader("📂 Charger un fichier des services (Excel)", type=["xlsx"], key="upload_service")
+    uploaded_file_service = persistent_uploader("📂 Charger un fichier des services (Excel)", ["xlsx"], "upload_service")
+    dropped = dropped_file("isolats") if uploaded_file_service is None else None
 
-    if uploaded_file_service is not None:
+    if uploaded_file_service is not None or dropped is not None:
         try:
-            df_service = pd.read_excel(uploaded_file_service)
-            df_service.columns = df_service.columns.str.strip()
-
-            if "DATE_ENTREE" not in df_service.columns:
+            if dropped is not None:
+                df_service, service_index = cached_drop(
+                    dropped, "services", lambda: (dropped.table, WeekServiceIndex.from_service_log(dropped.table)))
+            else:
+                df_service, service_index = cached_upload(uploaded_file_service, "services",
+                                                          lambda: load_services(uploaded_file_service))
+            if service_index is None:
                 st.error("❌ Colonne 'DATE_ENTREE' absente du fichier.")
                 st.write("Colonnes disponibles :", list(df_service.columns))
-                st.stop()
+                return
 
-            df_service['DATE_ENTREE'] = pd.to_datetime(df_service['DATE_ENTREE'], errors='coerce')
-            df_service['Week'] = df_service['DATE_ENTREE'].dt.isocalendar().week
+            if st.button("💾 Ajouter à l'historique", key="store_service"):
+                store.append("isolats", df_service)
+                st.success("Isolats enregistrés dans l'historique.")
 
-            unique_weeks = sorted(df_service['Week'].dropna().unique().astype(int))
-            selected_week = st.selectbox("📆 Choisir une semaine :", unique_weeks)
+            unique_weeks = sorted(service_index.by_year_week)
+            selected_year, selected_week = st.selectbox("📆 Choisir une semaine :", unique_weeks,
+                                                        format_func=lambda k: f"{k[0]} - S{k[1]:02d}",
+                                                        key="week_service")
 
-            services_week = df_service[df_service['Week'] == selected_week]['LIBELLE_DEMANDEUR'].dropna().unique()
-            st.markdown(f"### 🏥 Services ayant généré des analyses en semaine {selected_week}")
+            services_week = service_index.lookup(selected_week, selected_year)
+            st.markdown(f"### 🏥 Services ayant généré des analyses en semaine {selected_week} ({selected_year})")
 
             if len(services_week) > 0:
-                for s in services_week:
-                    st.write(f"🔹 {s}")
+                for s, n in services_week.items():
+                    st.write(f"🔹 {s} ({n} isolats)")
             else:
                 st.info("Aucun service n’a été enregistré cette semaine.")
 
@@ -444,3 +488,175 @@ with tab5:
             st.error(f"Erreur lors de la lecture du fichier : {str(e)}")
     else:
         st.info("📥 Veuillez charger un fichier pour afficher les services par semaine.")
+
+
+# === Onglet 6 : Résistance calculée depuis les isolats ===
+@st.fragment
+@profiled
+def resistance_panel():
+    st.header("🧮 Résistance par semaine et par service")
+    try:
+        with span("cube"):
+            cube = load_resistance_cube(SERVICE_LOG_PATH)
+        selected_ab = st.selectbox("Sélectionner un antibiotique", cube.antibiotics, key="ab_cube")
+        cube_weeks = cube.weeks
+        week_start, week_end = st.select_slider("Plage de semaines", cube_weeks, (cube_weeks[0], cube_weeks[-1]),
+                                                format_func=lambda k: f"{k[0]} - S{k[1]:02d}", key="range_cube")
+        selected_services = st.multiselect("Services (tous si aucun)", cube.services, key="services_cube")
+
+        with span("tableau_hebdomadaire") as timing:
+            weekly = cube.weekly_table(selected_services, week_start, week_end)
+            timing["rows"] = len(weekly)
+        pct_col = f"% R {selected_ab}"
+        weekly_x = weekly["Year"].astype(str) + "-S" + weekly["Week"].astype(str).str.zfill(2)
+
+        hover = (weekly[[selected_ab, f"R {selected_ab}"]].to_numpy(),
+                 "%{y:.2f} % (%{customdata[1]} R / %{customdata[0]} testés)")
+        with span("figure", rows=len(weekly)):
+            fig = threshold_figure(weekly_x, {pct_col: weekly[pct_col]}, hover={pct_col: hover})
+        with span("rendu_plotly"):
+            st.plotly_chart(fig, use_container_width=True)
+
+        with st.expander("📋 Matrice d'alertes - tous les antibiotiques"):
+            st.dataframe(alert_matrix(weekly, "Week", [f"% R {ab}" for ab in cube.antibiotics]), use_container_width=True)
+
+        st.markdown("### 🏥 Résistance par service")
+        with span("par_service"):
+            st.dataframe(cube.by_service(selected_ab, week_start, week_end), use_container_width=True)
+    except Exception as e:
+        st.error(f"Erreur lors du calcul à partir des isolats : {str(e)}")
+
+# Seul le panneau sélectionné est exécuté ; chaque panneau est un fragment,
+# donc ses widgets ne relancent que son propre code.
+WEEKLY_DATASETS = [
+    ("upload_ab", "ab2024", "antibiotiques", "Antibiotiques"),
+    ("upload_other", "ab_other", "autres_antibiotiques", "Autres antibiotiques"),
+]
+
+
+def report_service_index():
+    """Index des services : fichier chargé, sinon dépôt précalculé, sinon journal local."""
+    uploaded = st.session_state.get("upload_service_kept")
+    if uploaded is not None:
+        return cached_upload(uploaded, "services", lambda: load_services(uploaded))[1]
+    dropped = latest("isolats")
+    if dropped is not None:
+        return cached_drop(dropped, "services",
+                           lambda: (dropped.table, WeekServiceIndex.from_service_log(dropped.table)))[1]
+    return load_service_index(SERVICE_LOG_PATH) if os.path.exists(SERVICE_LOG_PATH) else None
+
+
+def report_sections(service_index):
+    """Séries à exporter, reprises des calculs en cache des onglets 1 à 3 ou du dépôt."""
+    service_year = service_index.main_year() if service_index is not None else None
+    sections = []
+    for upload_key, key, dataset, label in WEEKLY_DATASETS:
+        uploaded = st.session_state.get(f"{upload_key}_kept")
+        dropped = latest(dataset) if uploaded is None else None
+        if uploaded is not None:
+            df, week_col = cached_upload(uploaded, "hebdomadaire", lambda: load_weekly(uploaded))
+            source_name = uploaded.name
+        elif dropped is not None:
+            df, week_col, source_name = dropped.table, dropped.meta["week_col"], dropped.meta["source"]
+        else:
+            continue
+        if week_col is not None:
+            year = data_year(key, source_name, guess_year(source_name, service_year))
+            sections.append(Section(label, df, week_col, percent_columns(df), year, "Résistance (%)"))
+
+    uploaded = st.session_state.get("upload_pheno_kept")
+    dropped = latest("phenotypes") if uploaded is None else None
+    if uploaded is not None:
+        df = cached_upload(uploaded, "phenotypes", lambda: load_phenotypes(uploaded))
+    elif dropped is not None:
+        df = dropped.table
+    else:
+        return sections
+    sections.append(Section("Phénotypes", df, "Week", PHENO_PCT_COLS, None, "Part des isolats (%)"))
+    return sections
+
+
+def zip_directory(folder, target):
+    """Archive ZIP sur disque du contenu d'un répertoire, fichier par fichier."""
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path in sorted(Path(folder).rglob("*")):
+            if path.is_file():
+                archive.write(path, path.relative_to(folder))
+    return target
+
+
+def discard_report():
+    """Supprime l'archive du rapport de la session et du disque."""
+    path = st.session_state.pop("report_zip", None)
+    if path is not None:
+        Path(path).unlink(missing_ok=True)
+
+
+# === Onglet 7 : Export du rapport hebdomadaire ===
+@st.fragment
+@profiled
+def report_panel():
+    st.header("📦 Export du rapport hebdomadaire")
+    with span("sources"):
+        service_index = report_service_index()
+        sections = report_sections(service_index)
+    if not sections:
+        st.info("📥 Chargez des fichiers dans les onglets 1 à 3 (ou déposez-les dans le dossier de dépôt) "
+                "pour les exporter.")
+        return
+
+    st.write("📚 **Séries incluses** : " + ", ".join(f"{s.name} ({len(s.cols)})" for s in sections))
+    first, last = week_span(sections)
+    if first is None:
+        st.info("📥 Aucune semaine exploitable dans les séries chargées.")
+        return
+    col_start, col_end = st.columns(2)
+    start_year = col_start.number_input("Année de début", 2000, 2100, first[0], key="report_start_year")
+    start_week = col_start.number_input("Semaine de début", 1, 53, first[1], key="report_start_week")
+    end_year = col_end.number_input("Année de fin", 2000, 2100, last[0], key="report_end_year")
+    end_week = col_end.number_input("Semaine de fin", 1, 53, last[1], key="report_end_week")
+    html_charts = st.checkbox("Graphiques HTML", value=True, key="report_html")
+    images = st.checkbox("Images PNG", value=False, key="report_png", disabled=not HAS_KALEIDO,
+                         help=None if HAS_KALEIDO else "Nécessite le paquet kaleido.")
+
+    if st.button("📦 Générer le rapport", key="report_build"):
+        discard_report()
+        bar = st.progress(0.0, text="Génération du rapport…")
+        with span("rapport", rows=sum(len(s.cols) for s in sections)), tempfile.TemporaryDirectory() as tmp:
+            write_report(tmp, sections, service_index, (start_year, start_week), (end_year, end_week),
+                         html_charts=html_charts, images=images, progress=bar.progress)
+            # seul le chemin de l'archive reste dans la session ; elle est supprimée après téléchargement
+            fd, target = tempfile.mkstemp(prefix="rapport_surveillance-", suffix=".zip")
+            os.close(fd)
+            st.session_state["report_zip"] = zip_directory(tmp, target)
+        bar.empty()
+        st.success("Rapport prêt.")
+
+    path = st.session_state.get("report_zip")
+    if path is not None and os.path.exists(path):
+        with open(path, "rb") as archive:
+            st.download_button("⬇️ Télécharger le rapport (ZIP)", archive, file_name="rapport_surveillance.zip",
+                               mime="application/zip", key="report_download", on_click=discard_report)
+
+
+PANELS = {
+    "Antibiotiques 2024": lambda: weekly_antibiotics_panel(
+        "📌 Antibiotiques - Données 2024", "📂 Charger un fichier CSV ou Excel",
+        "upload_ab", "ab2024", "antibiotiques"),
+    "Autres Antibiotiques": lambda: weekly_antibiotics_panel(
+        "🧪 Autres Antibiotiques - Staph aureus", "📂 Charger un fichier pour Autres Antibiotiques",
+        "upload_other", "ab_other", "autres_antibiotiques"),
+    "Phénotypes Staph aureus": phenotypes_panel,
+    "Fiches Bactéries": bacteria_panel,
+    "Alertes par service": services_panel,
+    "Résistance par service": resistance_panel,
+    "Export du rapport": report_panel,
+}
+
+if DROP_DIR.is_dir():
+    for failed, error in list(drop_watcher().errors.items()):
+        st.warning(f"⚠️ Dossier de dépôt : {failed.name} n'a pas pu être analysé ({error}). "
+                   "Nouvel essai au prochain passage.")
+st.sidebar.toggle("⏱️ Profilage (debug)", key="debug_profile")
+selected_panel = st.radio("Navigation", list(PANELS), horizontal=True, label_visibility="collapsed", key="panel")
+PANELS[selected_panel]()
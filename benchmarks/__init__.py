@@ -0,0 +1 @@
+"""Banc d'essai des chemins de chargement et de calcul sur données synthétiques."""
@@ -0,0 +1,156 @@
+"""Mesure chaque étape critique sur données synthétiques et compare aux références.
+
+Exemples :
+    python -m benchmarks.run                      # échelle 1, comparaison aux références
+    python -m benchmarks.run --scale 10 --scale 100
+    python -m benchmarks.run --scale 10 --update-baseline
+
+Le code de sortie vaut 1 si une étape dépasse sa référence de plus de
+`--tolerance` (100 % par défaut). Les références de baselines.json dépendent
+de la machine : les régénérer avec --update-baseline sur la machine de mesure.
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from surveillance.alerts import alert_matrix, rolling_bounds
+from surveillance.charts import threshold_figure
+from surveillance.control import ControlChart
+from surveillance.cube import ResistanceCube
+from surveillance.loaders import (
+    normalize_service_log,
+    percent_columns,
+    phenotype_percentages,
+    prepare_weekly,
+    read_table,
+    weekly_columns,
+)
+from surveillance.report import Section, write_report
+from surveillance.services import WeekServiceIndex
+
+from .synthetic import phenotype_counts, service_log, weekly_table
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+MIN_DELTA = 0.010  # en dessous de 10 ms d'écart, le bruit de mesure domine
+
+
+def _measure(fn, repeat):
+    """(meilleur temps en s, pic mémoire en Mo, résultat).
+
+    Le pic mémoire est mesuré sur une première exécution, qui sert aussi de
+    mise en route (imports paresseux, caches) avant le chronométrage.
+    """
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, peak / 2 ** 20, result
+
+
+def run_scale(scale, repeat=3):
+    """Chronomètre les étapes à une échelle donnée ; renvoie {étape: (secondes, Mo, lignes)}."""
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        return _run_scale(scale, repeat, Path(workdir))
+
+
+def _run_scale(scale, repeat, workdir):
+    weekly = weekly_table(scale).drop(columns="Year")
+    isolates = service_log(scale)
+    phenos = phenotype_counts(scale)
+
+    weekly_csv = workdir / f"hebdo_{scale}.csv"
+    isolates_xlsx = workdir / f"isolats_{scale}.xlsx"
+    weekly.to_csv(weekly_csv, index=False)
+    isolates.to_excel(isolates_xlsx, index=False)
+
+    results = {}
+
+    def step(name, fn, rows):
+        seconds, peak, out = _measure(fn, repeat)
+        results[name] = (seconds, peak, rows)
+        return out
+
+    raw = step("ingestion_csv", lambda: read_table(weekly_csv, weekly_csv.name, columns=weekly_columns), len(weekly))
+    step("ingestion_excel", lambda: read_table(isolates_xlsx, isolates_xlsx.name), len(isolates))
+    table = step("coercion_semaines", lambda: prepare_weekly(raw.copy(), "Semaine"), len(raw))
+    log = step("dates_services", lambda: normalize_service_log(isolates.copy()), len(isolates))
+
+    cols = percent_columns(table)
+    step("seuils_iqr", lambda: alert_matrix(table, "Semaine", cols), len(table) * len(cols))
+    step("seuils_glissants", lambda: rolling_bounds(table[cols]), len(table) * len(cols))
+
+    index = step("index_services", lambda: WeekServiceIndex.from_service_log(log), len(log))
+    keys = list(index.by_year_week)
+    step("recherche_services", lambda: [index.lookup(w, y) for y, w in keys], len(keys))
+    step("cube_resistance", lambda: ResistanceCube.from_isolates(log), len(log))
+
+    pheno = phenotype_percentages(phenos.copy())
+    pheno_cols = [c for c in pheno.columns if c.startswith("% ")]
+    step("controle_ewma_cusum", lambda: ControlChart(pheno_cols + cols).run(
+        pd.concat([pheno[pheno_cols].reset_index(drop=True), table[cols].reset_index(drop=True)], axis=1),
+        pheno_cols + cols), max(len(pheno), len(table)) * (len(pheno_cols) + len(cols)))
+
+    series = {c: table[c] for c in cols[:10]}
+    step("figure_plotly", lambda: threshold_figure(np.arange(len(table)), series, 0, 10).to_json(),
+         len(table) * len(series))
+
+    section = Section("Antibiotiques", table, "Semaine", cols, 2024, "Résistance (%)")
+    step("export_rapport", lambda: write_report(workdir / "rapport", [section], index),
+         len(table) * len(cols))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Liste des étapes plus lentes que la référence au-delà de la tolérance."""
+    return [(name, seconds, baseline[name]) for name, (seconds, _, _) in results.items()
+            if name in baseline and seconds > baseline[name] * (1 + tolerance)
+            and seconds - baseline[name] > MIN_DELTA]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai sur données synthétiques.")
+    parser.add_argument("--scale", type=float, action="append", help="échelle (1 = fichiers d'exemple) ; répétable")
+    parser.add_argument("--repeat", type=int, default=3, help="répétitions par étape (meilleur temps retenu)")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="ralentissement relatif toléré avant échec")
+    parser.add_argument("--update-baseline", action="store_true", help="enregistre les temps comme références")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = []
+    for scale in args.scale or [1.0]:
+        key = f"{scale:g}"
+        results = run_scale(scale, args.repeat)
+        print(f"\n== Échelle {key} ==")
+        print(f"{'étape':<22}{'temps (ms)':>12}{'pic (Mo)':>10}{'lignes':>12}{'référence (ms)':>16}")
+        for name, (seconds, peak, rows) in results.items():
+            ref = baselines.get(key, {}).get(name)
+            ref_txt = f"{ref * 1000:.1f}" if ref is not None else "-"
+            print(f"{name:<22}{seconds * 1000:>12.1f}{peak:>10.1f}{rows:>12}{ref_txt:>16}")
+        if args.update_baseline:
+            baselines[key] = {name: round(seconds, 6) for name, (seconds, _, _) in results.items()}
+        else:
+            regressions += [(key, *r) for r in compare(results, baselines.get(key, {}), args.tolerance)]
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"\nRéférences enregistrées dans {args.baseline}")
+    for key, name, seconds, ref in regressions:
+        print(f"RÉGRESSION échelle {key} : {name} {seconds * 1000:.1f} ms > {ref * 1000:.1f} ms", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Générateurs de données synthétiques au format des exports du laboratoire.
+
+L'échelle 1 correspond aux fichiers d'exemple du dépôt (une année, quatre
+antibiotiques par tableau hebdomadaire, ~6 000 isolats répartis sur ~360
+services) ; l'échelle 10 ou 100 multiplie années, colonnes et isolats.
+"""
+import numpy as np
+import pandas as pd
+
+ANTIBIOTICS = ["Vancomycine", "Teicoplanine", "Gentamycine", "Oxacilline", "Daptomycine",
+               "Clindamycine", "Cotrimoxazole", "Linezolide"]
+BASE_ISOLATES = 6_000
+BASE_WARDS = 360
+BASE_ANTIBIOTICS = 4
+
+
+def _years(scale):
+    return max(1, int(round(scale ** 0.5)))
+
+
+def weekly_table(scale=1, seed=0):
+    """Tableau hebdomadaire 'Semaine' / '<ab>' / 'R <ab>' / '% R <ab>' avec une ligne Total.
+
+    Les semaines de toutes les années se suivent : la colonne Year donne l'année ISO.
+    """
+    rng = np.random.default_rng(seed)
+    years = _years(scale)
+    n_ab = max(BASE_ANTIBIOTICS, int(BASE_ANTIBIOTICS * scale / years))
+    n_weeks = 52 * years
+
+    data = {"Year": np.repeat(np.arange(2024 - years + 1, 2025), 52),
+            "Semaine": np.tile(np.arange(1, 53), years).astype(object)}
+    for i in range(n_ab):
+        name = f"Antibiotique {i + 1}"
+        tested = rng.poisson(140, n_weeks)
+        rate = rng.uniform(0.005, 0.15)
+        resistant = rng.binomial(tested, rate)
+        data[name] = tested
+        data[f"R {name}"] = resistant
+        data[f"% R {name}"] = np.round(resistant / np.maximum(tested, 1) * 100, 2)
+    df = pd.DataFrame(data)
+    total = {col: df[col].sum() for col in df.columns if col not in ("Year", "Semaine")}
+    total["Semaine"] = "Total"
+    return pd.concat([df, pd.DataFrame([total])], ignore_index=True)
+
+
+def service_log(scale=1, seed=0):
+    """Journal des isolats : DATE_ENTREE au format m/j/a, service demandeur et résultats S/R."""
+    rng = np.random.default_rng(seed)
+    n = int(BASE_ISOLATES * scale)
+    years = _years(scale)
+    wards = np.array([f"SERVICE {i:04d}" for i in range(int(BASE_WARDS * max(1.0, scale ** 0.5)))])
+
+    start = np.datetime64(f"{2024 - years + 1}-01-01")
+    dates = pd.to_datetime(start + rng.integers(0, 365 * years, n).astype("timedelta64[D]"))
+    df = pd.DataFrame({
+        "DATE_ENTREE": dates.month.astype(str) + "/" + dates.day.astype(str) + "/" + dates.year.astype(str),
+        "DEMANDEUR": rng.integers(1000, 9999, n).astype(str),
+        "LIBELLE_DEMANDEUR": wards[rng.zipf(1.3, n) % len(wards)],
+        "NATURE": "*******",
+        "CODE_GERME": "SAUR",
+        "LIB_GERME": "Staphylococcus aureus",
+    })
+    for ab in ANTIBIOTICS:
+        results = np.where(rng.random(n) < rng.uniform(0.01, 0.15), "R", "S").astype(object)
+        results[rng.random(n) < 0.08] = None
+        df[ab] = results
+    return df
+
+
+def phenotype_counts(scale=1, seed=0):
+    """Nombre hebdomadaire d'isolats MRSA / Other / VRSA / Wild, semaines datées du lundi."""
+    rng = np.random.default_rng(seed)
+    n_weeks = 53 * max(1, int(scale))
+    weeks = pd.date_range("2000-01-03", periods=n_weeks, freq="W-MON")
+    return pd.DataFrame({
+        "week": weeks,
+        "MRSA": rng.poisson(12, n_weeks),
+        "Other": rng.poisson(7, n_weeks),
+        "VRSA": rng.poisson(0.3, n_weeks),
+        "Wild": rng.poisson(100, n_weeks),
+    })
@@ -0,0 +1 @@
+"""Calculs de surveillance partagés entre le tableau de bord et les traitements hors ligne."""
@@ -0,0 +1,301 @@
+"""Seuils IQR (règle de Tukey) et verdicts d'alerte."""
+import bisect
+import json
+import os
+import tempfile
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .control import CONTROL_DIR
+
+HIGH, LOW, NORMAL = "Élevé", "Bas", "Normal"
+
+
+def iqr_bounds(values):
+    """Seuils (bas, haut) de Tukey pour une série ; le seuil bas est borné à 0."""
+    q1, q3 = np.percentile(values, [25, 75])
+    iqr = q3 - q1
+    return max(q1 - 1.5 * iqr, 0), q3 + 1.5 * iqr
+
+
+def verdict(value, lower, upper):
+    if value > upper:
+        return HIGH
+    if value < lower:
+        return LOW
+    return NORMAL
+
+
+def to_matrix(df, cols):
+    """Tableau 2-D float (semaines x colonnes), valeurs non numériques -> NaN."""
+    return df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+
+def alert_matrix(df, week_col, cols):
+    """Seuils, dernière valeur, verdict, moyenne et semaine du pic de toutes les colonnes.
+
+    Un seul passage NumPy sur la matrice semaines x antibiotiques ; les colonnes
+    entièrement vides donnent des NaN.
+    """
+    values = to_matrix(df, cols)
+    weeks = df[week_col].to_numpy()
+    present = ~np.isnan(values)
+    has_data = present.any(axis=0)
+    n_weeks, n_cols = values.shape
+
+    q1, q3 = np.full(n_cols, np.nan), np.full(n_cols, np.nan)
+    mean = np.full(n_cols, np.nan)
+    if has_data.any():
+        q1[has_data], q3[has_data] = np.nanpercentile(values[:, has_data], [25, 75], axis=0)
+        mean[has_data] = np.nanmean(values[:, has_data], axis=0)
+    iqr = q3 - q1
+    lower = np.maximum(q1 - 1.5 * iqr, 0)
+    upper = q3 + 1.5 * iqr
+
+    cols_idx = np.arange(n_cols)
+    last_row = n_weeks - 1 - np.argmax(present[::-1], axis=0)
+    last = np.where(has_data, values[last_row, cols_idx] if n_weeks else np.nan, np.nan)
+    peak_row = np.argmax(np.where(present, values, -np.inf), axis=0)
+
+    status = np.select([last > upper, last < lower], [HIGH, LOW], NORMAL).astype(object)
+    status[~has_data] = None
+
+    return pd.DataFrame({
+        "Q1": q1,
+        "Q3": q3,
+        "Seuil bas": lower,
+        "Seuil haut": upper,
+        "Dernière valeur": last,
+        "Semaine": np.where(has_data, weeks[last_row] if n_weeks else None, None),
+        "Statut": status,
+        "Écart au seuil haut": last - upper,
+        "Moyenne": mean,
+        "Semaine du pic": np.where(has_data, weeks[peak_row] if n_weeks else None, None),
+        "Nb semaines": present.sum(axis=0),
+    }, index=pd.Index(cols, name="Antibiotique"))
+
+
+ROLLING_WINDOW = 26
+MIN_HISTORY = 8
+
+
+def rolling_bounds(values, window=ROLLING_WINDOW, min_periods=MIN_HISTORY):
+    """Seuils de Tukey semaine par semaine, calculés sur les `window` semaines précédentes.
+
+    La semaine jugée n'entre jamais dans sa propre fenêtre. Accepte une Series
+    ou un DataFrame (toutes les colonnes en une fois) ; NaN tant que
+    l'historique compte moins de `min_periods` valeurs.
+    """
+    history = values.shift(1).rolling(window, min_periods=min_periods)
+    q1 = history.quantile(0.25)
+    q3 = history.quantile(0.75)
+    iqr = q3 - q1
+    return (q1 - 1.5 * iqr).clip(lower=0), q3 + 1.5 * iqr
+
+
+def threshold_bands(series, selected, rolling=True):
+    """Seuils (bas, haut) alignés sur les lignes `selected` de `series`.
+
+    En mode glissant l'historique antérieur à la sélection est utilisé ; sinon
+    une bande constante est calculée sur la seule sélection.
+    """
+    if rolling:
+        lower, upper = rolling_bounds(series)
+        return lower.loc[selected], upper.loc[selected]
+    lower, upper = iqr_bounds(series.loc[selected].dropna())
+    return pd.Series(lower, index=selected), pd.Series(upper, index=selected)
+
+
+class RollingIQR:
+    """Bande de Tukey glissante mise à jour semaine après semaine.
+
+    La fenêtre est conservée triée : chaque ajout ou retrait est localisé par
+    bisection (O(log w) comparaisons) sans retrier la fenêtre ; l'insertion
+    elle-même décale la liste en O(w), un simple memmove pour w = 26.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW, min_periods=MIN_HISTORY):
+        self.window = window
+        self.min_periods = min_periods
+        self._fifo = deque()
+        self._sorted = []
+
+    @classmethod
+    def from_history(cls, values, window=ROLLING_WINDOW, min_periods=MIN_HISTORY):
+        engine = cls(window, min_periods)
+        for value in values:
+            engine.push(value)
+        return engine
+
+    def _quantile(self, q):
+        pos = q * (len(self._sorted) - 1)
+        lo = int(pos)
+        hi = min(lo + 1, len(self._sorted) - 1)
+        return self._sorted[lo] + (self._sorted[hi] - self._sorted[lo]) * (pos - lo)
+
+    def bounds(self):
+        """Seuils applicables à la prochaine semaine, (nan, nan) si l'historique est trop court."""
+        if len(self._sorted) < self.min_periods:
+            return np.nan, np.nan
+        q1, q3 = self._quantile(0.25), self._quantile(0.75)
+        iqr = q3 - q1
+        return max(q1 - 1.5 * iqr, 0), q3 + 1.5 * iqr
+
+    def push(self, value):
+        """Ajoute une semaine (NaN compris) à la fenêtre."""
+        self._fifo.append(value)
+        if not np.isnan(value):
+            bisect.insort(self._sorted, value)
+        if len(self._fifo) > self.window:
+            old = self._fifo.popleft()
+            if not np.isnan(old):
+                del self._sorted[bisect.bisect_left(self._sorted, old)]
+
+    def update(self, value):
+        """Juge `value` contre l'historique puis l'ajoute ; renvoie (bas, haut, verdict)."""
+        lower, upper = self.bounds()
+        status = None if np.isnan(upper) or np.isnan(value) else verdict(value, lower, upper)
+        self.push(value)
+        return lower, upper, status
+
+    def window_values(self):
+        """Semaines de la fenêtre dans l'ordre d'arrivée (NaN compris), pour la sauvegarde."""
+        return list(self._fifo)
+
+
+class RollingBands:
+    """Moteurs RollingIQR de plusieurs séries, sauvegardés pour reprendre semaine après semaine.
+
+    Une nouvelle semaine ne met à jour que les fenêtres, sans relire l'historique.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW, min_periods=MIN_HISTORY):
+        self.window = window
+        self.min_periods = min_periods
+        self.engines = {}
+        self.last = {}
+        self.last_key = None
+
+    def _engine(self, name):
+        if name not in self.engines:
+            self.engines[name] = RollingIQR(self.window, self.min_periods)
+        return self.engines[name]
+
+    def run(self, df, cols, key_cols):
+        """Intègre les lignes de `df` postérieures à `last_key`, dans l'ordre des clés ; renvoie leur nombre."""
+        df = df.sort_values(list(key_cols))
+        values = df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        keys = list(df[list(key_cols)].itertuples(index=False, name=None))
+        engines = [self._engine(c) for c in cols]
+        added = 0
+        for row, key in zip(values, keys):
+            key = tuple(int(k) for k in key)
+            if self.last_key is not None and key <= self.last_key:
+                continue
+            for col, engine, value in zip(cols, engines, row):
+                lower, upper, status = engine.update(value)
+                if not np.isnan(value):
+                    self.last[col] = (key, value, lower, upper, status)
+            self.last_key = key
+            added += 1
+        return added
+
+    def status(self):
+        """Dernier verdict de chaque série et seuils applicables à la semaine suivante."""
+        rows = {}
+        for name, engine in self.engines.items():
+            key, value, lower, upper, status = self.last.get(name, (None, np.nan, np.nan, np.nan, None))
+            next_lower, next_upper = engine.bounds()
+            rows[name] = {
+                "Dernière semaine": f"{key[0]}-S{key[1]:02d}" if key else None,
+                "Dernière valeur": value,
+                "Seuil glissant haut": upper,
+                "Statut glissant": status,
+                "Seuil bas suivant": next_lower,
+                "Seuil haut suivant": next_upper,
+            }
+        return pd.DataFrame.from_dict(rows, orient="index").rename_axis("Série")
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        clean = lambda v: None if v is None or (isinstance(v, float) and np.isnan(v)) else v
+        state = {
+            "window": self.window,
+            "min_periods": self.min_periods,
+            "last_key": self.last_key,
+            "series": {name: [clean(float(v)) for v in engine.window_values()]
+                       for name, engine in self.engines.items()},
+            "last": {name: [list(key), clean(float(value)), clean(float(lower)), clean(float(upper)), status]
+                     for name, (key, value, lower, upper, status) in self.last.items()},
+        }
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        state = json.loads(Path(path).read_text(encoding="utf-8"))
+        bands = cls(state["window"], state["min_periods"])
+        bands.last_key = tuple(state["last_key"]) if state["last_key"] else None
+        nan = lambda v: np.nan if v is None else v
+        for name, window in state["series"].items():
+            bands.engines[name] = RollingIQR.from_history([nan(v) for v in window], bands.window, bands.min_periods)
+        for name, (key, value, lower, upper, status) in state["last"].items():
+            bands.last[name] = (tuple(key), nan(value), nan(lower), nan(upper), status)
+        return bands
+
+
+def load_bands(dataset, root=CONTROL_DIR):
+    """Bandes glissantes sauvegardées de `dataset`, None si aucune semaine n'a été intégrée."""
+    path = Path(root) / f"{dataset}_bandes.json"
+    return RollingBands.load(path) if path.exists() else None
+
+
+def update_bands_persisted(dataset, df, cols, key_cols=("Year", "Week"), root=CONTROL_DIR, history=None):
+    """Fait avancer les bandes glissantes sauvegardées de `dataset` avec les nouvelles semaines de `df`.
+
+    Des semaines antérieures ou égales à la dernière déjà intégrée (rattrapage,
+    correction) imposent de tout recalculer à partir de `history()`, l'historique
+    complet ; sans `history`, elles sont refusées par ValueError. Renvoie
+    (bandes, recalcul complet effectué).
+    """
+    path = Path(root) / f"{dataset}_bandes.json"
+    bands = RollingBands.load(path) if path.exists() else RollingBands()
+    keys = df[list(key_cols)].astype(int)
+    first = tuple(keys.sort_values(list(key_cols)).iloc[0]) if len(keys) else None
+    rebuilt = bands.last_key is not None and first is not None and first <= bands.last_key
+    if rebuilt:
+        if history is None:
+            raise ValueError(f"semaines antérieures à {bands.last_key} : historique complet requis")
+        bands = RollingBands(bands.window, bands.min_periods)
+        df = history()
+    bands.run(df, [c for c in cols if c in df.columns], key_cols)
+    bands.save(path)
+    return bands, rebuilt
+
+
+def rolling_status(df, cols):
+    """Verdict de la dernière semaine renseignée de chaque colonne, contre sa bande glissante."""
+    values = df[cols].apply(pd.to_numeric, errors="coerce")
+    lower, upper = rolling_bounds(values)
+    present = values.notna().to_numpy()
+    has_data = present.any(axis=0)
+    cols_idx = np.arange(len(cols))
+    last_row = len(values) - 1 - np.argmax(present[::-1], axis=0)
+
+    last = values.to_numpy(dtype=float)[last_row, cols_idx]
+    lo = lower.to_numpy(dtype=float)[last_row, cols_idx]
+    up = upper.to_numpy(dtype=float)[last_row, cols_idx]
+    status = np.select([last > up, last < lo], [HIGH, LOW], NORMAL).astype(object)
+    status[~has_data | np.isnan(up)] = None
+
+    return pd.DataFrame({
+        "Seuil glissant bas": lo,
+        "Seuil glissant haut": up,
+        "Statut glissant": status,
+    }, index=pd.Index(cols, name="Antibiotique"))
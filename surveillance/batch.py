@@ -0,0 +1,155 @@
+"""Traitement hors navigateur d'un répertoire d'exports hebdomadaires.
+
+Exemple :
+    python -m surveillance.batch exports/ -o rapports/ -j 4
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from .alerts import HIGH, alert_matrix, rolling_status
+from .loaders import (
+    PHENOTYPES,
+    SERVICE_LOG_PATH,
+    detect_kind,
+    find_week_column,
+    guess_year,
+    normalize_service_log,
+    percent_columns,
+    phenotype_percentages,
+    prepare_weekly,
+    read_table,
+)
+from .services import WeekServiceIndex, load_service_index
+
+SUFFIXES = (".csv", ".xlsx")
+
+
+def _peak_services(index, week, year=None):
+    if index is None or week is None or pd.isna(week):
+        return ""
+    if isinstance(week, date):
+        year, week_no, _ = week.isocalendar()
+        services = index.lookup(week_no, year)
+    else:
+        services = index.lookup(week, year)
+    return "; ".join(f"{s} ({n})" for s, n in services.items())
+
+
+def _series_alerts(df, week_col, cols, index, year=None):
+    table = alert_matrix(df, week_col, cols).join(rolling_status(df, cols))
+    table["Services semaine du pic"] = [_peak_services(index, w, year) for w in table["Semaine du pic"]]
+    table["Services semaine en alerte"] = [
+        _peak_services(index, w, year) if s == HIGH else ""
+        for w, s in zip(table["Semaine"], table["Statut glissant"])
+    ]
+    return table
+
+
+def analyse(df, kind, index=None, year=None):
+    """Table normalisée, colonne semaine et table de résultats d'un export de type `kind`.
+
+    Antibiotiques et phénotypes : verdicts IQR, statut glissant et services des
+    semaines de pic ; journal des services : isolats par semaine et service.
+    `year` est l'année ISO des numéros de semaine d'un export d'antibiotiques.
+    """
+    if kind == "antibiotiques":
+        week_col = find_week_column(df.columns)
+        df = prepare_weekly(df, week_col)
+        return df, week_col, _series_alerts(df, week_col, percent_columns(df), index, year)
+    if kind == "phenotypes":
+        df = phenotype_percentages(df)
+        return df, "Week", _series_alerts(df, "Week", [f"% {p}" for p in PHENOTYPES], index)
+    if kind == "services":
+        df = normalize_service_log(df)
+        services = WeekServiceIndex.from_service_log(df).by_year_week
+        table = pd.DataFrame(
+            [(y, w, s, n) for (y, w), counts in services.items() for s, n in counts.items()],
+            columns=["Année", "Semaine", "Service", "Isolats"],
+        ).sort_values(["Année", "Semaine", "Isolats"], ascending=[True, True, False])
+        return df, "Week", table
+    return df, None, None
+
+
+def process_file(path, output_dir, service_log=None, index=None):
+    """Analyse un export et écrit sa table d'alertes ; renvoie (type, table ou None).
+
+    `index` (WeekServiceIndex déjà construit) évite de relire `service_log`.
+    """
+    path = Path(path)
+    df = read_table(path, path.name)
+    df.columns = df.columns.str.strip()
+    kind = detect_kind(df)
+    if index is None and service_log and os.path.exists(service_log) and kind in ("antibiotiques", "phenotypes"):
+        index = load_service_index(service_log)
+
+    year = guess_year(path.name, index.main_year() if index is not None else None)
+    _, _, table = analyse(df, kind, index, year)
+    if kind == "services":
+        table.to_csv(Path(output_dir) / f"{path.stem}_services.csv", index=False)
+        return kind, None
+    if table is None:
+        return kind, None
+
+    table.to_csv(Path(output_dir) / f"{path.stem}_alertes.csv")
+    return kind, table
+
+
+_worker_index = None
+
+
+def _init_worker(index):
+    # index des services construit une fois par le parent, transmis une fois par processus
+    global _worker_index
+    _worker_index = index
+
+
+def _process(args):
+    path, output_dir = args
+    try:
+        kind, table = process_file(path, output_dir, index=_worker_index)
+        return path, kind, table, None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+def run(input_dir, output_dir, service_log=SERVICE_LOG_PATH, workers=None):
+    """Traite tous les exports de `input_dir` en parallèle et écrit le résumé ; renvoie ce résumé."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    files = sorted(p for p in Path(input_dir).iterdir() if p.suffix.lower() in SUFFIXES)
+
+    index = load_service_index(service_log) if service_log and os.path.exists(service_log) else None
+    tables, report = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) as pool:
+        for path, kind, table, error in pool.map(_process, [(p, output_dir) for p in files]):
+            report.append({"Fichier": path.name, "Type": kind, "Erreur": error})
+            if table is not None:
+                tables.append(table.reset_index().assign(Fichier=path.name))
+
+    pd.DataFrame(report).to_csv(output_dir / "fichiers.csv", index=False)
+    summary = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    summary.to_csv(output_dir / "resume_alertes.csv", index=False)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse hebdomadaire de surveillance sans interface.")
+    parser.add_argument("input_dir", help="répertoire des exports CSV/Excel")
+    parser.add_argument("-o", "--output-dir", default="rapports", help="répertoire de sortie")
+    parser.add_argument("-s", "--services", default=SERVICE_LOG_PATH,
+                        help="journal des isolats par service pour les semaines de pic")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="nombre de processus")
+    args = parser.parse_args(argv)
+
+    summary = run(args.input_dir, args.output_dir, args.services, args.jobs)
+    n_alerts = int((summary.get("Statut glissant") == HIGH).sum()) if not summary.empty else 0
+    print(f"{len(summary)} séries analysées, {n_alerts} en alerte -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
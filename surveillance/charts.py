@@ -0,0 +1,81 @@
+"""Construction allégée des graphiques Plotly : seuils en formes, WebGL et sous-échantillonnage."""
+import numpy as np
+import plotly.graph_objects as go
+
+GL_THRESHOLD = 1000
+MAX_POINTS = 2000
+
+
+def lttb(y, n_out):
+    """Indices conservés par Largest-Triangle-Three-Buckets (premier et dernier points inclus)."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def _scatter(n_points):
+    return go.Scattergl if n_points > GL_THRESHOLD else go.Scatter
+
+
+def _add_bound(fig, x, bound, name, dash, max_points):
+    values = np.broadcast_to(np.asarray(bound, dtype=float), x.shape)
+    finite = values[~np.isnan(values)]
+    if finite.size == 0:
+        return
+    if finite.size == values.size and np.ptp(finite) == 0:
+        # seuil constant : une forme de mise en page plutôt qu'une trace de n points
+        fig.add_hline(y=finite[0], line_dash=dash, line_width=1,
+                      annotation_text=name, annotation_position="top left")
+        return
+    idx = np.unique(np.linspace(0, len(x) - 1, min(len(x), max_points)).astype(int))
+    fig.add_trace(_scatter(len(idx))(x=x[idx], y=values[idx], mode='lines', name=name, line=dict(dash=dash)))
+
+
+def threshold_figure(x, series, lower=None, upper=None, x_title="Semaine", y_title="Résistance (%)",
+                     y_range=None, hover=None, max_points=MAX_POINTS):
+    """Courbes superposées (`series` : nom -> valeurs alignées sur `x`) et seuils bas / haut.
+
+    Les séries longues sont réduites à `max_points` par LTTB et passent en
+    WebGL au-delà de GL_THRESHOLD points. `hover` associe éventuellement à une
+    série un couple (customdata, hovertemplate).
+    """
+    x = np.asarray(x)
+    hover = hover or {}
+    fig = go.Figure()
+    for name, y in series.items():
+        y = np.asarray(y, dtype=float)
+        present = np.flatnonzero(~np.isnan(y))
+        idx = present[lttb(y[present], max_points)]
+        extra = {}
+        if name in hover:
+            customdata, template = hover[name]
+            extra = dict(customdata=np.asarray(customdata)[idx], hovertemplate=template)
+        mode = 'lines' if len(idx) > GL_THRESHOLD else 'lines+markers'
+        fig.add_trace(_scatter(len(idx))(x=x[idx], y=y[idx], mode=mode, name=name, **extra))
+
+    if upper is not None:
+        _add_bound(fig, x, upper, "Seuil haut", "dash", max_points)
+    if lower is not None:
+        _add_bound(fig, x, lower, "Seuil bas", "dot", max_points)
+
+    layout = dict(xaxis_title=x_title, yaxis_title=y_title)
+    if y_range is not None:
+        layout["yaxis"] = dict(range=y_range)
+    fig.update_layout(**layout)
+    return fig
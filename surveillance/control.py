@@ -0,0 +1,233 @@
+"""Cartes de contrôle EWMA et CUSUM, calculées en même temps sur toutes les séries.
+
+L'état (moyenne et variance courantes, EWMA, sommes CUSUM) tient dans des
+tableaux NumPy d'une case par série : une nouvelle semaine met à jour toutes
+les séries en temps constant, et l'état peut être sauvegardé puis repris.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CONTROL_DIR = Path(os.environ.get("SURVEILLANCE_CONTROL_DIR", "data/control"))
+
+EWMA_LAMBDA = 0.3
+EWMA_L = 3.0
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+WARMUP_WEEKS = 8
+
+_STATE = ["count", "mean", "m2", "ewma", "cusum_pos", "cusum_neg"]
+# derniers signaux de chaque série, pour afficher un état repris sans rejouer l'historique
+_SIGNALS = {"last_high": "ewma_haut", "last_cusum": "cusum_haut",
+            "last_alarm_ewma": "alerte_ewma", "last_alarm_cusum": "alerte_cusum"}
+_FILL = {"ewma": np.nan, "last_high": np.nan, "last_cusum": np.nan}
+
+
+class ControlChart:
+
+    def __init__(self, names, lam=EWMA_LAMBDA, width=EWMA_L, k=CUSUM_K, h=CUSUM_H, warmup=WARMUP_WEEKS):
+        self.names = []
+        self.lam, self.width, self.k, self.h, self.warmup = lam, width, k, h, warmup
+        self.last_key = None
+        for field in _STATE + list(_SIGNALS) + ["alarm_weeks"]:
+            setattr(self, field, np.zeros(0))
+        self.ensure_series(names)
+
+    def ensure_series(self, names):
+        """Ajoute un état vierge pour les séries encore inconnues."""
+        new = [n for n in names if n not in self.names]
+        if not new:
+            return
+        self.names += new
+        for field in _STATE + list(_SIGNALS) + ["alarm_weeks"]:
+            setattr(self, field, np.concatenate([getattr(self, field), np.full(len(new), _FILL.get(field, 0.0))]))
+
+    def update(self, values, key=None):
+        """Intègre une semaine (une valeur par série, NaN si absente) et renvoie ses statistiques.
+
+        La semaine est jugée contre l'état antérieur, puis y est ajoutée.
+        """
+        x = np.asarray(values, dtype=float)
+        seen = ~np.isnan(x)
+        sd = np.sqrt(np.where(self.count > 1, self.m2 / np.maximum(self.count - 1, 1), np.nan))
+        ready = seen & (self.count >= self.warmup) & (sd > 0)
+
+        ewma = np.where(seen, np.where(np.isnan(self.ewma), x, self.lam * x + (1 - self.lam) * self.ewma), self.ewma)
+        spread = self.width * sd * np.sqrt(self.lam / (2 - self.lam))
+        ewma_high, ewma_low = self.mean + spread, self.mean - spread
+
+        z = np.where(ready, (x - self.mean) / np.where(sd > 0, sd, 1), 0.0)
+        cusum_pos = np.where(ready, np.maximum(0, self.cusum_pos + z - self.k), self.cusum_pos)
+        cusum_neg = np.where(ready, np.maximum(0, self.cusum_neg - z - self.k), self.cusum_neg)
+
+        ewma_alarm = ready & (ewma > ewma_high)
+        cusum_alarm = ready & (cusum_pos > self.h)
+        result = {
+            "ewma": np.where(seen, ewma, np.nan),
+            "ewma_haut": np.where(ready, ewma_high, np.nan),
+            "ewma_bas": np.where(ready, ewma_low, np.nan),
+            "cusum_haut": np.where(ready, cusum_pos, np.nan),
+            "cusum_bas": np.where(ready, cusum_neg, np.nan),
+            "alerte_ewma": ewma_alarm,
+            "alerte_cusum": cusum_alarm,
+        }
+
+        # mise à jour de la moyenne et de la variance (Welford)
+        count = self.count + seen
+        delta = np.where(seen, x - self.mean, 0.0)
+        mean = self.mean + np.where(seen, delta / np.maximum(count, 1), 0.0)
+        self.m2 = self.m2 + np.where(seen, delta * (x - mean), 0.0)
+        self.count, self.mean, self.ewma = count, mean, ewma
+        # une somme CUSUM qui a déclenché repart de zéro
+        self.cusum_pos = np.where(cusum_alarm, 0.0, cusum_pos)
+        self.cusum_neg = np.where(ready & (cusum_neg > self.h), 0.0, cusum_neg)
+        for field, stat in _SIGNALS.items():
+            setattr(self, field, np.where(seen, result[stat], getattr(self, field)))
+        self.alarm_weeks = self.alarm_weeks + (ewma_alarm | cusum_alarm)
+        if key is not None:
+            self.last_key = key
+        return result
+
+    def run(self, df, cols, key_cols=None):
+        """Applique `update` ligne par ligne ; renvoie un DataFrame (ligne x statistique x série).
+
+        Avec `key_cols`, les lignes doivent suivre la dernière semaine déjà
+        intégrée, dans l'ordre des clés : sinon ValueError, et l'état n'est pas
+        modifié (une semaine antérieure impose de tout recalculer).
+        """
+        self.ensure_series(cols)
+        positions = [self.names.index(c) for c in cols]
+        values = df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        if key_cols:
+            keys = [tuple(int(k) for k in key) for key in df[key_cols].itertuples(index=False, name=None)]
+            previous = [self.last_key] + keys[:-1]
+            late = [key for key, before in zip(keys, previous) if before is not None and key <= before]
+            if late:
+                raise ValueError(f"semaine {late[0]} antérieure ou égale à la précédente : recalcul complet requis")
+        else:
+            keys = [None] * len(df)
+
+        stacked, index = {}, []
+        full = np.full(len(self.names), np.nan)
+        for label, row, key in zip(df.index, values, keys):
+            full[:] = np.nan
+            full[positions] = row
+            for stat, value in self.update(full, key).items():
+                stacked.setdefault(stat, []).append(value[positions])
+            index.append(label)
+        if not index:
+            return pd.DataFrame(index=pd.Index([], dtype=df.index.dtype))
+        return pd.concat({stat: pd.DataFrame(np.vstack(arrays), index=index, columns=cols)
+                          for stat, arrays in stacked.items()}, axis=1)
+
+    def status(self):
+        """Dernier état de chaque série (moyenne de référence, EWMA, sommes CUSUM)."""
+        return pd.DataFrame({
+            "Semaines": self.count.astype(int),
+            "Moyenne": self.mean,
+            "EWMA": self.ewma,
+            "CUSUM +": self.cusum_pos,
+            "CUSUM -": self.cusum_neg,
+        }, index=pd.Index(self.names, name="Série"))
+
+    def signals(self, cols=None):
+        """Derniers signaux de chaque série (EWMA, limite haute, CUSUM, alertes), sans rejouer l'historique."""
+        positions = [self.names.index(c) for c in cols] if cols is not None else list(range(len(self.names)))
+        table = pd.DataFrame({
+            "EWMA": self.ewma[positions],
+            "Limite EWMA": self.last_high[positions],
+            "CUSUM +": self.last_cusum[positions],
+            "Alerte EWMA": self.last_alarm_ewma[positions].astype(bool),
+            "Alerte CUSUM": self.last_alarm_cusum[positions].astype(bool),
+            "Semaines en alerte": self.alarm_weeks[positions].astype(int),
+        }, index=pd.Index([self.names[i] for i in positions], name="Série"))
+        return table.sort_values(["Alerte CUSUM", "Alerte EWMA", "CUSUM +"], ascending=False)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, names=np.array(self.names, dtype=str),
+                     params=np.array([self.lam, self.width, self.k, self.h, self.warmup]),
+                     last_key=np.array(self.last_key if self.last_key is not None else (), dtype=float),
+                     **{field: getattr(self, field) for field in _STATE + list(_SIGNALS) + ["alarm_weeks"]})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            lam, width, k, h, warmup = data["params"]
+            chart = cls([], lam, width, k, h, int(warmup))
+            chart.names = [str(name) for name in data["names"]]
+            for field in _STATE:
+                setattr(chart, field, data[field])
+            # états sauvegardés avant l'ajout des derniers signaux
+            for field in list(_SIGNALS) + ["alarm_weeks"]:
+                default = np.full(len(chart.names), _FILL.get(field, 0.0))
+                setattr(chart, field, data[field] if field in data.files else default)
+            last_key = data["last_key"]
+            chart.last_key = tuple(int(v) for v in last_key) if last_key.size else None
+        return chart
+
+
+def load_chart(dataset, root=CONTROL_DIR):
+    """Carte de contrôle sauvegardée de `dataset`, None si aucune semaine n'a été intégrée.
+
+    Un état illisible (ancien format aux noms enregistrés en objets Python) compte
+    comme absent ; le prochain ajout à l'historique le recalcule.
+    """
+    path = Path(root) / f"{dataset}.npz"
+    if not path.exists():
+        return None
+    try:
+        return ControlChart.load(path)
+    except ValueError:
+        return None
+
+
+def drift_chart(chart, df, cols, key_cols=("Year", "Week")):
+    """Carte `chart` (reprise par `load_chart`) avancée des semaines de `df` qui lui sont postérieures.
+
+    Rien n'est sauvegardé ; sans carte (None), elle est calculée sur `df` seul.
+    """
+    chart = chart if chart is not None else ControlChart(cols)
+    key_cols = list(key_cols)
+    df = df.dropna(subset=key_cols).sort_values(key_cols)
+    if chart.last_key is not None:
+        keys = df[key_cols].astype(int).itertuples(index=False, name=None)
+        df = df[[key > chart.last_key for key in keys]]
+    chart.run(df, cols, key_cols)
+    return chart
+
+
+def update_persisted(dataset, df, cols, key_cols=("Year", "Week"), root=CONTROL_DIR, history=None):
+    """Fait avancer la carte sauvegardée de `dataset` avec les nouvelles semaines de `df`.
+
+    Comme pour les bandes glissantes, des semaines antérieures ou égales à la
+    dernière intégrée, ou un état sauvegardé illisible, imposent de tout
+    recalculer à partir de `history()` ; sans `history`, ValueError. Renvoie
+    (carte, recalcul complet effectué).
+    """
+    path = Path(root) / f"{dataset}.npz"
+    chart = load_chart(dataset, root)
+    key_cols = list(key_cols)
+    df = df.dropna(subset=key_cols).sort_values(key_cols)
+    try:
+        if chart is None and path.exists():
+            raise ValueError(f"état illisible : {path}")
+        chart = chart or ControlChart(cols)
+        chart.run(df, cols, key_cols)
+        rebuilt = False
+    except ValueError:
+        if history is None:
+            raise
+        chart = ControlChart(cols, chart.lam, chart.width, chart.k, chart.h, chart.warmup) if chart else ControlChart(cols)
+        df = history()
+        chart.run(df.sort_values(key_cols), [c for c in cols if c in df.columns], key_cols)
+        rebuilt = True
+    chart.save(path)
+    return chart, rebuilt
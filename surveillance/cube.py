@@ -0,0 +1,122 @@
+"""Cube semaine x service x antibiotique des isolats testés et résistants."""
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
+
+from .loaders import SERVICE_LOG_PATH, load_service_log
+from .services import SERVICE_COL
+
+ISOLATE_META = ["DATE_ENTREE", "DEMANDEUR", SERVICE_COL, "NATURE", "CODE_GERME", "LIB_GERME", "Year", "Week"]
+KEY = ["Year", "Week", SERVICE_COL]
+SIR = ("S", "I", "R")
+
+
+def sir_flags(df):
+    """Isolats testés (S, I ou R) et résistants (R) de chaque colonne d'antibiotique.
+
+    Une colonne texte hors métadonnées est un antibiotique si la majorité de
+    ses valeurs renseignées sont S, I ou R : un code isolé (F...) ne l'exclut
+    pas, mais ne compte pas comme un test. Seules les valeurs distinctes sont
+    normalisées, une fois.
+    """
+    tested, resistant = {}, {}
+    for col in df.columns:
+        if col in ISOLATE_META or not (is_object_dtype(df[col]) or is_string_dtype(df[col])):
+            continue
+        codes, uniques = pd.factorize(df[col])
+        labels = pd.Index(uniques).astype("string").str.strip().str.upper()
+        # le code -1 (valeur manquante) lit la case False ajoutée en fin de tableau
+        flag = lambda mask: np.append(np.asarray(mask, dtype=bool), False)[codes]
+        is_sir = flag(labels.isin(SIR))
+        if is_sir.sum() * 2 > flag(~labels.isin([""])).sum():
+            tested[col], resistant[col] = is_sir, flag(labels.isin(["R"]))
+    return pd.DataFrame(tested, index=df.index), pd.DataFrame(resistant, index=df.index)
+
+
+def antibiotic_columns(df):
+    """Colonnes de résultats S/I/R du journal des isolats."""
+    return list(sir_flags(df)[0].columns)
+
+
+class ResistanceCube:
+    """Nombre d'isolats testés / résistants par (année, semaine, service) et antibiotique.
+
+    Le cube est construit en un seul groupby ; taux de résistance, détail par
+    service et plages de semaines s'obtiennent ensuite par découpage.
+    """
+
+    def __init__(self, tested, resistant):
+        self.tested = tested
+        self.resistant = resistant
+        index = tested.index
+        self._keys = index.get_level_values("Year").to_numpy() * 100 + index.get_level_values("Week").to_numpy()
+
+    @classmethod
+    def from_isolates(cls, df):
+        df = df.dropna(subset=KEY)
+        tested, resistant = sir_flags(df)
+        flags = pd.concat({"tested": tested, "resistant": resistant}, axis=1)
+        keys = [df[col].astype(int) if col != SERVICE_COL else df[col] for col in KEY]
+        counts = flags.groupby(keys).sum().astype(np.int64).sort_index()
+        return cls(counts["tested"], counts["resistant"])
+
+    @property
+    def antibiotics(self):
+        return list(self.tested.columns)
+
+    @property
+    def services(self):
+        return sorted(self.tested.index.get_level_values(SERVICE_COL).unique())
+
+    @property
+    def weeks(self):
+        """Clés (année, semaine) présentes, triées."""
+        return list(self.tested.index.droplevel(SERVICE_COL).unique())
+
+    def _mask(self, services=None, start=None, end=None):
+        mask = np.ones(len(self._keys), dtype=bool)
+        if start is not None:
+            mask &= self._keys >= start[0] * 100 + start[1]
+        if end is not None:
+            mask &= self._keys <= end[0] * 100 + end[1]
+        if services:
+            mask &= self.tested.index.get_level_values(SERVICE_COL).isin(services)
+        return mask
+
+    def weekly_table(self, services=None, start=None, end=None):
+        """Tableau hebdomadaire au format des fichiers importés : '<ab>', 'R <ab>', '% R <ab>'."""
+        mask = self._mask(services, start, end)
+        tested = self.tested[mask].groupby(level=["Year", "Week"]).sum()
+        resistant = self.resistant[mask].groupby(level=["Year", "Week"]).sum()
+        pct = (resistant / tested.where(tested > 0)) * 100
+
+        columns = {}
+        for ab in self.antibiotics:
+            columns[ab] = tested[ab]
+            columns[f"R {ab}"] = resistant[ab]
+            columns[f"% R {ab}"] = pct[ab]
+        return pd.DataFrame(columns).reset_index()
+
+    def by_service(self, antibiotic, start=None, end=None):
+        """Testés, résistants et % R par service pour un antibiotique, du plus résistant au moins."""
+        mask = self._mask(start=start, end=end)
+        tested = self.tested.loc[mask, antibiotic].groupby(level=SERVICE_COL).sum()
+        resistant = self.resistant.loc[mask, antibiotic].groupby(level=SERVICE_COL).sum()
+        table = pd.DataFrame({"Testés": tested, "Résistants": resistant})
+        table = table[table["Testés"] > 0]
+        table["% R"] = table["Résistants"] / table["Testés"] * 100
+        return table.sort_values(["% R", "Testés"], ascending=False)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_resistance_cube(path, mtime_ns, size):
+    return ResistanceCube.from_isolates(load_service_log(path))
+
+
+def load_resistance_cube(path=SERVICE_LOG_PATH):
+    """Cube du journal des isolats, reconstruit uniquement si le fichier change."""
+    stat = os.stat(path)
+    return _load_resistance_cube(str(path), stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,224 @@
+"""Chargement des fichiers sources avec instantané colonnaire sur disque."""
+import functools
+import hashlib
+import os
+import re
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+SERVICE_LOG_PATH = "staph aureus hebdomadaire excel.xlsx"
+WEEK_COLUMNS = ("Week", "Semaine")
+PHENOTYPES = ["MRSA", "Other", "VRSA", "Wild"]
+SERVICE_COLUMNS = ["DATE_ENTREE", "LIBELLE_DEMANDEUR"]
+CHUNK_ROWS = 50_000
+CACHE_DIR = Path(os.environ.get("SURVEILLANCE_CACHE_DIR", ".cache/surveillance"))
+
+
+def bytes_digest(data):
+    """Empreinte SHA-1 d'un contenu en mémoire."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def file_digest(path):
+    """Empreinte SHA-1 du contenu d'un fichier."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _column_filter(columns):
+    if columns is None:
+        return lambda name: True
+    if callable(columns):
+        return columns
+    wanted = set(columns)
+    return lambda name: name in wanted
+
+
+def _source_size(source):
+    size = getattr(source, "size", None)
+    if size is None and isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+    return size
+
+
+def _read_csv(source, keep, progress):
+    size = _source_size(source)
+    chunks = []
+    reader = pd.read_csv(source, usecols=lambda name: keep(name.strip()), chunksize=CHUNK_ROWS)
+    for chunk in reader:
+        chunks.append(chunk)
+        if progress and size and hasattr(source, "tell"):
+            progress(min(source.tell() / size, 1.0))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def _read_excel(source, keep, progress):
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        # première feuille, comme pd.read_excel : la feuille active peut être une autre
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        positions = [i for i, name in enumerate(header) if name and keep(name)]
+        names = [header[i] for i in positions]
+        total = ws.max_row
+
+        chunks, buffer = [], []
+        for n, row in enumerate(rows, start=1):
+            buffer.append([row[i] if i < len(row) else None for i in positions])
+            if len(buffer) == CHUNK_ROWS:
+                chunks.append(pd.DataFrame(buffer, columns=names))
+                buffer = []
+                if progress and total:
+                    progress(min(n / total, 1.0))
+        chunks.append(pd.DataFrame(buffer, columns=names))
+        return pd.concat(chunks, ignore_index=True)
+    finally:
+        wb.close()
+
+
+def read_table(source, name, columns=None, progress=None):
+    """Lit un fichier CSV ou Excel selon l'extension de `name`.
+
+    Le fichier est parcouru par blocs (classeurs en lecture seule) et seules les
+    colonnes retenues sont conservées : `columns` est une liste de noms ou un
+    prédicat sur le nom (sans espaces superflus). `progress` reçoit
+    l'avancement entre 0 et 1.
+    """
+    keep = _column_filter(columns)
+    if str(name).endswith(".csv"):
+        df = _read_csv(source, keep, progress)
+    else:
+        df = _read_excel(source, keep, progress)
+    df.columns = [str(col).strip() for col in df.columns]
+    if progress:
+        progress(1.0)
+    return df
+
+
+def weekly_columns(name):
+    """Colonnes utiles d'un tableau hebdomadaire d'antibiotiques : semaine et pourcentages."""
+    return name in WEEK_COLUMNS or name.startswith('%')
+
+
+def phenotype_columns(name):
+    return name == "week" or name in PHENOTYPES
+
+
+def find_week_column(columns):
+    """Nom de la colonne semaine ('Week' ou 'Semaine'), None si absente."""
+    for col in WEEK_COLUMNS:
+        if col in columns:
+            return col
+    return None
+
+
+def guess_year(name, default=None):
+    """Année lue dans le nom du fichier (ex. '..._2024.csv'), sinon `default` ou l'année ISO en cours."""
+    match = re.search(r"(?<!\d)(?:19|20)\d{2}(?!\d)", str(name))
+    if match:
+        return int(match.group())
+    return default if default is not None else date.today().isocalendar()[0]
+
+
+def percent_columns(df):
+    return [col for col in df.columns if col.startswith('%')]
+
+
+def prepare_weekly(df, week_col):
+    """Garde les lignes dont la semaine est un entier (écarte les totaux) et trie par semaine."""
+    weeks = pd.to_numeric(df[week_col], errors="coerce")
+    valid = weeks.notna() & (weeks >= 0) & (weeks % 1 == 0)
+    df = df[valid].copy()
+    df[week_col] = weeks[valid].astype(int)
+    return df.sort_values(week_col)
+
+
+def phenotype_percentages(df):
+    """Semaine en date (colonne Week), total des isolats et part de chaque phénotype."""
+    df["week"] = pd.to_datetime(df["week"], errors="coerce")
+    df = df.dropna(subset=["week"]).sort_values("week")
+    df["Week"] = df["week"].dt.date
+    df["Total"] = df[PHENOTYPES].sum(axis=1)
+    for pheno in PHENOTYPES:
+        df[f"% {pheno}"] = (df[pheno] / df["Total"]) * 100
+    return df
+
+
+def detect_kind(df):
+    """Type de fichier reconnu : 'antibiotiques', 'phenotypes', 'services', 'bacteries' ou None."""
+    columns = set(df.columns.str.strip())
+    if find_week_column(columns) and any(col.startswith('%') for col in columns):
+        return "antibiotiques"
+    if {"week", *PHENOTYPES} <= columns:
+        return "phenotypes"
+    if "DATE_ENTREE" in columns:
+        return "services"
+    if "Category" in columns:
+        return "bacteries"
+    return None
+
+
+def normalize_service_log(df):
+    """Type DATE_ENTREE et ajoute l'année et la semaine ISO (colonnes Year / Week)."""
+    df.columns = df.columns.str.strip()
+    df["DATE_ENTREE"] = pd.to_datetime(df["DATE_ENTREE"], errors="coerce")
+    iso = df["DATE_ENTREE"].dt.isocalendar()
+    df["Year"] = iso["year"]
+    df["Week"] = iso["week"]
+    return df
+
+
+def _snapshot_path(path, digest):
+    return CACHE_DIR / f"{Path(path).stem}-{digest[:16]}.parquet"
+
+
+@functools.lru_cache(maxsize=8)
+def _load_service_log(path, mtime_ns, size):
+    # mtime_ns et size ne servent qu'à invalider le cache mémoire
+    snapshot = _snapshot_path(path, file_digest(path))
+    if snapshot.exists():
+        return pd.read_parquet(snapshot)
+
+    df = normalize_service_log(read_table(path, path))
+    snapshot.parent.mkdir(parents=True, exist_ok=True)
+    # nom temporaire propre à chaque écrivain : processus du batch, thread du dépôt, sessions
+    fd, tmp = tempfile.mkstemp(dir=snapshot.parent, prefix=f".{snapshot.stem}-", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        if not snapshot.exists():
+            os.replace(tmp, snapshot)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    _prune_snapshots(snapshot)
+    return df
+
+
+def _prune_snapshots(snapshot):
+    # instantanés des contenus précédents du même fichier : seul le dernier sert
+    stem = snapshot.stem.rsplit("-", 1)[0]
+    pattern = re.compile(rf"{re.escape(stem)}-[0-9a-f]{{16}}\.parquet")
+    for old in snapshot.parent.glob("*.parquet"):
+        if old != snapshot and pattern.fullmatch(old.name):
+            old.unlink(missing_ok=True)
+
+
+def load_service_log(path=SERVICE_LOG_PATH):
+    """Journal des isolats par service, déjà typé et avec la semaine ISO calculée.
+
+    Le classeur n'est relu que si son contenu change : l'instantané Parquet est
+    indexé par l'empreinte du fichier et le résultat est mémorisé en mémoire
+    tant que la date de modification et la taille restent identiques.
+    Le DataFrame renvoyé est partagé : ne pas le modifier en place.
+    """
+    stat = os.stat(path)
+    return _load_service_log(str(path), stat.st_mtime_ns, stat.st_size)
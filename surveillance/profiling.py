@@ -0,0 +1,99 @@
+"""Chronométrage des étapes d'un rafraîchissement et journal JSON lines.
+
+    run = start_run("Antibiotiques 2024", session="...")
+    with span("lecture") as s:
+        df = ...
+        s["rows"] = len(df)
+    finish_run(run)
+
+`span` ne fait rien de coûteux hors d'un rafraîchissement en cours : les
+fonctions de calcul peuvent donc être instrumentées sans dépendre de l'interface.
+"""
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROFILE_LOG = os.environ.get("SURVEILLANCE_PROFILE_LOG")
+
+_current = contextvars.ContextVar("surveillance_profile", default=None)
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb():
+    """Mémoire résidente du processus en Mo (None si indisponible)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+class RunProfile:
+
+    def __init__(self, panel, session=None):
+        self.panel = panel
+        self.session = session
+        self.started = time.perf_counter()
+        self.timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.spans = []
+        self.total_ms = None
+
+    def table(self):
+        """Étapes du rafraîchissement : nom, durée (ms), lignes, variation mémoire (Mo)."""
+        return [{"Étape": s["name"], "Durée (ms)": s["ms"], "Lignes": s["rows"], "Δ mémoire (Mo)": s["rss_mb"]}
+                for s in self.spans]
+
+    def to_json(self):
+        return json.dumps({
+            "ts": self.timestamp,
+            "session": self.session,
+            "panel": self.panel,
+            "total_ms": self.total_ms,
+            "spans": self.spans,
+        }, ensure_ascii=False)
+
+
+def start_run(panel, session=None):
+    run = RunProfile(panel, session)
+    run._token = _current.set(run)
+    return run
+
+
+def finish_run(run, log_path=PROFILE_LOG):
+    """Clôt le rafraîchissement et l'ajoute au journal JSON lines s'il est configuré."""
+    run.total_ms = round((time.perf_counter() - run.started) * 1000, 2)
+    _current.reset(run._token)
+    if log_path:
+        path = Path(log_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(run.to_json() + "\n")
+    return run
+
+
+@contextmanager
+def span(name, rows=None):
+    """Mesure le bloc englobé ; le dictionnaire produit accepte une clé 'rows'."""
+    run = _current.get()
+    record = {"name": name, "rows": rows}
+    if run is None:
+        yield record
+        return
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        rss_after = rss_mb()
+        record["rss_mb"] = round(rss_after - rss_before, 2) if rss_before is not None else None
+        run.spans.append(record)
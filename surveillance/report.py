@@ -0,0 +1,237 @@
+"""Export groupé du rapport hebdomadaire : classeur Excel multi-feuilles et graphiques statiques.
+
+Les séries sont traitées une à une et écrites au fil de l'eau (classeur en mode
+écriture seule, un fichier par graphique) : la mémoire ne dépend pas du nombre
+de séries exportées.
+
+Exemple :
+    python -m surveillance.report -o rapport/ --debut 2024-01 --fin 2024-52
+"""
+import argparse
+import html
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from .alerts import HIGH, LOW, NORMAL, rolling_bounds, to_matrix
+from .charts import threshold_figure
+from .loaders import PHENOTYPES, SERVICE_LOG_PATH, guess_year, percent_columns
+from .services import WeekServiceIndex, load_service_index
+from .watcher import WARM_DIR, latest
+
+try:
+    import kaleido  # noqa: F401
+    HAS_KALEIDO = True
+except ImportError:
+    HAS_KALEIDO = False
+
+Section = namedtuple("Section", ["name", "table", "week_col", "cols", "year", "y_title"])
+
+SUMMARY_HEADER = ["Jeu", "Série", "Semaines", "Dernière semaine", "Dernière valeur", "Seuil bas",
+                  "Seuil haut", "Statut", "Moyenne", "Pic", "Semaine du pic", "Semaines en alerte"]
+SERIES_HEADER = ["Année", "Semaine", "Date", "Série", "Valeur", "Seuil bas", "Seuil haut", "Statut"]
+SERVICES_HEADER = ["Jeu", "Série", "Année", "Semaine", "Valeur", "Seuil haut", "Service", "Isolats"]
+
+
+def _week_key(year, week):
+    return int(year) * 100 + int(week)
+
+
+def _iso_weeks(section):
+    """(années, semaines) ISO de chaque ligne : année fixe ou dates de la colonne semaine."""
+    weeks = section.table[section.week_col]
+    if section.year is not None:
+        weeks = pd.to_numeric(weeks, errors="coerce").to_numpy()
+        return np.full(len(weeks), section.year), weeks
+    iso = pd.to_datetime(weeks, errors="coerce").dt.isocalendar()
+    return iso["year"].to_numpy(dtype=float), iso["week"].to_numpy(dtype=float)
+
+
+def _cell(value):
+    # openpyxl n'accepte ni NaN ni les scalaires NumPy hors nombres
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else pd.Timestamp(value).to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _slug(text):
+    ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^0-9A-Za-z]+", "_", ascii_text).strip("_") or "serie"
+
+
+def _sheet_title(name, used):
+    title = re.sub(r"[\[\]:*?/\\]", "", name)[:31] or "Feuille"
+    base, n = title, 2
+    while title in used:
+        title = f"{base[:28]}~{n}"
+        n += 1
+    used.add(title)
+    return title
+
+
+def week_span(sections):
+    """Première et dernière semaines ISO (année, semaine) couvertes par les sections."""
+    keys = np.concatenate([_week_keys(s) for s in sections] or [np.array([])])
+    keys = keys[~np.isnan(keys)]
+    if not keys.size:
+        return None, None
+    first, last = int(keys.min()), int(keys.max())
+    return divmod(first, 100), divmod(last, 100)
+
+
+def _week_keys(section):
+    years, weeks = _iso_weeks(section)
+    return years * 100 + weeks
+
+
+def write_report(output_dir, sections, service_index=None, start=None, end=None,
+                 html_charts=True, images=False, progress=None):
+    """Écrit `rapport.xlsx` et les graphiques de toutes les séries ; renvoie le chemin du classeur.
+
+    `start` / `end` sont des couples (année, semaine) ISO inclus. Les seuils sont
+    les bandes glissantes de l'application, calculées sur tout l'historique avant
+    le filtrage de la plage. `progress(fraction)` est appelé après chaque série.
+    """
+    output_dir = Path(output_dir)
+    charts_dir = output_dir / "graphiques"
+    if html_charts or images:
+        charts_dir.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    wb = Workbook(write_only=True)
+    used = set()
+    summary = wb.create_sheet(_sheet_title("Résumé", used))
+    summary.append(SUMMARY_HEADER)
+    services = wb.create_sheet(_sheet_title("Alertes services", used))
+    services.append(SERVICES_HEADER)
+    charts = []
+
+    total = sum(len(s.cols) for s in sections) or 1
+    done = 0
+    for section in sections:
+        sheet = wb.create_sheet(_sheet_title(section.name, used))
+        sheet.append(SERIES_HEADER)
+        years, weeks = _iso_weeks(section)
+        keys = years * 100 + weeks
+        mask = ~np.isnan(keys)
+        if start is not None:
+            mask &= keys >= _week_key(*start)
+        if end is not None:
+            mask &= keys <= _week_key(*end)
+        rows = np.flatnonzero(mask)
+        labels = section.table[section.week_col].to_numpy()
+        values = to_matrix(section.table, section.cols)
+        lower, upper = (b.to_numpy() for b in rolling_bounds(pd.DataFrame(values)))
+
+        for j, col in enumerate(section.cols):
+            y, lo, hi = values[rows, j], lower[rows, j], upper[rows, j]
+            status = np.select([y > hi, y < lo], [HIGH, LOW], NORMAL).astype(object)
+            status[np.isnan(y) | np.isnan(hi)] = None
+            for i, row in enumerate(rows):
+                date = _cell(labels[row]) if section.year is None else None
+                sheet.append([_cell(years[row]), _cell(weeks[row]), date, col,
+                              _cell(y[i]), _cell(lo[i]), _cell(hi[i]), status[i]])
+                if status[i] == HIGH and service_index is not None:
+                    for service, n in service_index.lookup(weeks[row], years[row]).items():
+                        services.append([section.name, col, _cell(years[row]), _cell(weeks[row]),
+                                         _cell(y[i]), _cell(hi[i]), service, n])
+
+            present = np.flatnonzero(~np.isnan(y))
+            if present.size:
+                last, peak = present[-1], present[np.argmax(y[present])]
+                summary.append([section.name, col, int(present.size), _cell(labels[rows[last]]),
+                                _cell(y[last]), _cell(lo[last]), _cell(hi[last]), status[last],
+                                _cell(np.mean(y[present])), _cell(y[peak]), _cell(labels[rows[peak]]),
+                                int((status == HIGH).sum())])
+            else:
+                summary.append([section.name, col, 0] + [None] * (len(SUMMARY_HEADER) - 3))
+
+            if (html_charts or images) and present.size:
+                fig = threshold_figure(labels[rows], {col: y}, lo, hi, y_title=section.y_title)
+                fig.update_layout(title=f"{section.name} - {col}")
+                stem = f"{_slug(section.name)}_{_slug(col)}"
+                if html_charts:
+                    # plotly.min.js est écrit une seule fois à côté des pages
+                    fig.write_html(charts_dir / f"{stem}.html", include_plotlyjs="directory")
+                    charts.append((section.name, col, f"{stem}.html"))
+                if images:
+                    fig.write_image(charts_dir / f"{stem}.png")
+            done += 1
+            if progress:
+                progress(done / total)
+
+    if charts:
+        links = "\n".join(f'<li><a href="{html.escape(f)}">{html.escape(s)} - {html.escape(c)}</a></li>'
+                          for s, c, f in charts)
+        (charts_dir / "index.html").write_text(
+            f"<!DOCTYPE html><meta charset='utf-8'><title>Graphiques</title><ul>\n{links}\n</ul>\n",
+            encoding="utf-8")
+
+    path = output_dir / "rapport.xlsx"
+    wb.save(path)
+    return path
+
+
+def precomputed_sections(warm_dir=WARM_DIR, service_year=None):
+    """Sections du rapport à partir des dernières générations du dossier de dépôt."""
+    sections = []
+    for dataset, label in (("antibiotiques", "Antibiotiques"), ("autres_antibiotiques", "Autres antibiotiques")):
+        dropped = latest(dataset, warm_dir)
+        if dropped is not None:
+            sections.append(Section(label, dropped.table, dropped.meta["week_col"], percent_columns(dropped.table),
+                                    guess_year(dropped.meta["source"], service_year), "Résistance (%)"))
+    dropped = latest("phenotypes", warm_dir)
+    if dropped is not None:
+        sections.append(Section("Phénotypes", dropped.table, "Week", [f"% {p}" for p in PHENOTYPES],
+                                None, "Part des isolats (%)"))
+    return sections
+
+
+def _parse_week(text):
+    match = re.fullmatch(r"(\d{4})-?S?(\d{1,2})", text.strip(), re.IGNORECASE)
+    if match is None or not 1 <= int(match.group(2)) <= 53:
+        raise argparse.ArgumentTypeError(f"semaine invalide : {text!r} (attendu AAAA-SS)")
+    return int(match.group(1)), int(match.group(2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapport hebdomadaire de surveillance en un seul passage.")
+    parser.add_argument("-o", "--output-dir", default="rapport", help="répertoire de sortie")
+    parser.add_argument("--depot", default=WARM_DIR, help="répertoire des résultats précalculés")
+    parser.add_argument("-s", "--services", default=SERVICE_LOG_PATH,
+                        help="journal des isolats par service (à défaut du dépôt)")
+    parser.add_argument("--debut", type=_parse_week, help="première semaine incluse, AAAA-SS")
+    parser.add_argument("--fin", type=_parse_week, help="dernière semaine incluse, AAAA-SS")
+    parser.add_argument("--sans-html", action="store_true", help="pas de graphiques HTML")
+    parser.add_argument("--images", action="store_true", help="graphiques PNG (nécessite kaleido)")
+    args = parser.parse_args(argv)
+    if args.images and not HAS_KALEIDO:
+        parser.error("--images nécessite le paquet kaleido (pip install kaleido)")
+
+    isolates = latest("isolats", args.depot)
+    if isolates is not None:
+        index = WeekServiceIndex.from_service_log(isolates.table)
+    elif args.services and os.path.exists(args.services):
+        index = load_service_index(args.services)
+    else:
+        index = None
+    sections = precomputed_sections(args.depot, index.main_year() if index else None)
+    if not sections:
+        parser.error(f"aucune donnée précalculée dans {args.depot}")
+    path = write_report(args.output_dir, sections, index, args.debut, args.fin,
+                        html_charts=not args.sans_html, images=args.images)
+    print(f"{sum(len(s.cols) for s in sections)} séries exportées -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Index de recherche plein texte et approchée pour le catalogue des bactéries."""
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+
+SEARCH_FIELDS = {"Category": 3.0, "Key Antibiotics": 2.0, "Phenotype": 1.5, "Other Antibiotics": 1.0}
+MIN_SIMILARITY = 0.5
+
+
+def normalize(text):
+    """Minuscules sans accents ni ponctuation."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def tokenize(text):
+    return normalize(text).split()
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """Distance de Damerau-Levenshtein restreinte (une transposition compte pour 1)."""
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def max_edits(term):
+    return 0 if len(term) < 4 else 1 if len(term) < 7 else 2
+
+
+class CatalogueIndex:
+    """Index inversé (mots et trigrammes) construit une fois par fichier chargé.
+
+    `search` tolère accents et fautes de frappe et classe les fiches par
+    pertinence ; `get` renvoie une fiche par sa catégorie en O(1).
+    """
+
+    def __init__(self, df, fields=SEARCH_FIELDS):
+        self.fields = {f: w for f, w in fields.items() if f in df.columns}
+        self.records = {}
+        self.postings = defaultdict(dict)
+        for row in df.to_dict("records"):
+            category = row.get("Category")
+            if category is None or category != category or category in self.records:
+                continue
+            self.records[category] = row
+            for field, weight in self.fields.items():
+                value = row.get(field)
+                if value is None or value != value:
+                    continue
+                for token in tokenize(value):
+                    doc = self.postings[token]
+                    doc[category] = max(doc.get(category, 0.0), weight)
+
+        self.vocabulary = sorted(self.postings)
+        self.grams = defaultdict(set)
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.grams[gram].add(token)
+
+    def _candidates(self, term):
+        """Mots du vocabulaire proches de `term` : {mot: similarité entre 0 et 1}."""
+        matches = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches[token] = 1.0 if token == term else 0.9
+
+        term_grams = trigrams(term)
+        shared = defaultdict(int)
+        for gram in term_grams:
+            for token in self.grams.get(gram, ()):
+                shared[token] += 1
+        allowed = max_edits(term)
+        for token, n in shared.items():
+            if token in matches:
+                continue
+            similarity = n / (len(term_grams) + len(trigrams(token)) - n)
+            distance = edit_distance(term, token) if abs(len(token) - len(term)) <= allowed else allowed + 1
+            if distance <= allowed:
+                similarity = max(similarity, 1 - distance / max(len(term), len(token)))
+            elif similarity < MIN_SIMILARITY:
+                continue
+            matches[token] = similarity
+        return matches
+
+    def search(self, query, limit=None):
+        """Catégories classées par score décroissant ; toutes si la requête est vide."""
+        terms = tokenize(query)
+        if not terms:
+            return list(self.records)[:limit]
+
+        scores = None
+        for term in terms:
+            term_scores = defaultdict(float)
+            for token, similarity in self._candidates(term).items():
+                for category, weight in self.postings[token].items():
+                    term_scores[category] = max(term_scores[category], similarity * weight)
+            if scores is None:
+                scores = dict(term_scores)
+            else:
+                scores = {c: s + term_scores[c] for c, s in scores.items() if c in term_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return ranked[:limit]
+
+    def get(self, category):
+        return self.records[category]
@@ -0,0 +1,58 @@
+"""Index semaine -> services demandeurs, avec le nombre d'isolats par service."""
+import functools
+import os
+
+from .loaders import SERVICE_LOG_PATH, load_service_log
+
+SERVICE_COL = "LIBELLE_DEMANDEUR"
+
+
+def _nested_counts(counts):
+    # Série indexée (clé..., service) -> {clé: {service: n}} trié par n décroissant
+    index = {}
+    levels = list(range(counts.index.nlevels - 1))
+    for key, group in counts.groupby(level=levels, sort=False):
+        group = group.sort_values(ascending=False, kind="stable")
+        key = tuple(int(k) for k in key)
+        key = key if len(key) > 1 else key[0]
+        index[key] = {service: int(n) for service, n in zip(group.index.get_level_values(-1), group.to_numpy())}
+    return index
+
+
+class WeekServiceIndex:
+    """Services présents par (année ISO, semaine ISO), construit en un seul groupby."""
+
+    def __init__(self, by_year_week, by_week):
+        self.by_year_week = by_year_week
+        self.by_week = by_week
+
+    @classmethod
+    def from_service_log(cls, df_service):
+        df = df_service.dropna(subset=["Week", SERVICE_COL])
+        by_year_week = _nested_counts(df.groupby(["Year", "Week", SERVICE_COL], sort=False).size())
+        by_week = _nested_counts(df.groupby(["Week", SERVICE_COL], sort=False).size())
+        return cls(by_year_week, by_week)
+
+    def lookup(self, week, year=None):
+        """{service: nombre d'isolats} pour la semaine ; toutes années confondues si year est None."""
+        if year is None:
+            return self.by_week.get(int(week), {})
+        return self.by_year_week.get((int(year), int(week)), {})
+
+    def main_year(self):
+        """Année ISO comptant le plus d'isolats (None si l'index est vide)."""
+        totals = {}
+        for (year, _), counts in self.by_year_week.items():
+            totals[year] = totals.get(year, 0) + sum(counts.values())
+        return max(totals, key=totals.get) if totals else None
+
+
+@functools.lru_cache(maxsize=8)
+def _load_service_index(path, mtime_ns, size):
+    return WeekServiceIndex.from_service_log(load_service_log(path))
+
+
+def load_service_index(path=SERVICE_LOG_PATH):
+    """Index du journal des services, reconstruit uniquement si le fichier change."""
+    stat = os.stat(path)
+    return _load_service_index(str(path), stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,151 @@
+"""Historique local multi-années, partitionné par année ISO.
+
+Chaque jeu de données (isolats, antibiotiques, phénotypes...) est rangé sous
+`<racine>/<nom>/year=<AAAA>.parquet` et indexé par les colonnes Year / Week.
+Les ajouts ne réécrivent que les partitions des années concernées et les
+lectures sur une plage de semaines n'ouvrent que les années nécessaires.
+Les écritures d'un jeu sont sérialisées par un verrou partagé entre threads
+(boutons de l'application, dossier de dépôt) et entre processus.
+"""
+import contextlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .alerts import update_bands_persisted
+from .control import CONTROL_DIR, update_persisted
+
+STORE_DIR = Path(os.environ.get("SURVEILLANCE_STORE_DIR", "data/store"))
+KEY = ["Year", "Week"]
+
+
+_THREAD_LOCKS = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+def _week_key(year, week):
+    return int(year) * 100 + int(week)
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SurveillanceStore:
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+
+    def _partition(self, name, year):
+        return self.root / name / f"year={int(year)}.parquet"
+
+    def years(self, name):
+        """Années disponibles pour un jeu de données."""
+        folder = self.root / name
+        if not folder.exists():
+            return []
+        return sorted(int(p.stem.split("=")[1]) for p in folder.glob("year=*.parquet"))
+
+    @contextlib.contextmanager
+    def lock(self, name):
+        """Verrou exclusif du jeu `name` : threads du processus puis autres processus."""
+        path = self.root / name / ".lock"
+        with _THREAD_LOCKS_GUARD:
+            thread_lock = _THREAD_LOCKS.setdefault(str(path.resolve()), threading.Lock())
+        with thread_lock, _file_lock(path):
+            yield
+
+    def append(self, name, df):
+        """Ajoute des lignes portant Year / Week ; les semaines déjà stockées sont remplacées."""
+        with self.lock(name):
+            self._append(name, df)
+
+    def _append(self, name, df):
+        df = df.dropna(subset=KEY).astype({"Year": int, "Week": int})
+        for year, part in df.groupby("Year"):
+            path = self._partition(name, year)
+            if path.exists():
+                old = pd.read_parquet(path)
+                old = old[~old["Week"].isin(part["Week"].unique())]
+                part = pd.concat([old, part], ignore_index=True)
+            part = part.sort_values(KEY, kind="stable")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+            os.close(fd)
+            try:
+                part.to_parquet(tmp, index=False)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def read(self, name, start=None, end=None, columns=None):
+        """Lignes entre les semaines `start` et `end` incluses, données en tuples (année, semaine)."""
+        years = self.years(name)
+        if start is not None:
+            years = [y for y in years if y >= start[0]]
+        if end is not None:
+            years = [y for y in years if y <= end[0]]
+        if columns is not None:
+            columns = list(dict.fromkeys(KEY + list(columns)))
+
+        parts = [self._read_partition(name, y, columns) for y in years]
+        if not parts:
+            return pd.DataFrame(columns=columns or KEY)
+        df = pd.concat(parts, ignore_index=True)
+        key = df["Year"] * 100 + df["Week"]
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= key >= _week_key(*start)
+        if end is not None:
+            mask &= key <= _week_key(*end)
+        return df[mask].reset_index(drop=True)
+
+    def _read_partition(self, name, year, columns):
+        # une partition plus ancienne peut ne pas avoir toutes les colonnes : absentes -> NaN
+        path = self._partition(name, year)
+        if columns is None:
+            return pd.read_parquet(path)
+        present = set(pq.read_schema(path).names)
+        df = pd.read_parquet(path, columns=[c for c in columns if c in present])
+        return df.reindex(columns=columns)
+
+
+def append_tracked(store, dataset, rows, cols, root=CONTROL_DIR):
+    """Ajoute des semaines à l'historique et fait avancer les états persistés de leurs séries.
+
+    Bandes glissantes et cartes EWMA / CUSUM avancent ensemble, sous le verrou
+    du jeu. Renvoie True si des semaines antérieures aux états ont imposé un
+    recalcul complet depuis l'historique.
+    """
+    with store.lock(dataset):
+        store._append(dataset, rows)
+        history = lambda: store.read(dataset, columns=list(cols))
+        _, bands_rebuilt = update_bands_persisted(dataset, rows, cols, KEY, root, history)
+        _, chart_rebuilt = update_persisted(dataset, rows, cols, KEY, root, history)
+    return bands_rebuilt or chart_rebuilt
@@ -0,0 +1,107 @@
+"""Cache des fichiers chargés, partagé entre sessions, adressé par contenu et borné en mémoire (LRU)."""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+UPLOAD_CACHE_MB = float(os.environ.get("SURVEILLANCE_UPLOAD_CACHE_MB", "512"))
+# Avec la copie à l'écriture (pandas >= 3), une copie superficielle protège déjà l'entrée partagée ;
+# le mode "warn" de pandas 2 n'active que des avertissements
+COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
+def nbytes(value, _seen=None):
+    """Taille mémoire approximative d'un résultat mis en cache, en octets."""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(nbytes(k, seen) + nbytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(nbytes(v, seen) for v in value)
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        size += nbytes(vars(value), seen)
+    return size
+
+
+def _share(value):
+    """Vue propre à l'appelant : les tables sont copiées, les index restent partagés (lecture seule)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=not COPY_ON_WRITE)
+    if isinstance(value, tuple):
+        return tuple(_share(v) for v in value)
+    return value
+
+
+class UploadCache:
+    """Résultats d'analyse par (empreinte, étape), bornés par un budget mémoire LRU."""
+
+    def __init__(self, budget_mb=UPLOAD_CACHE_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def get(self, key, build):
+        """Valeur en cache pour `key`, sinon `build()` calculé une seule fois même en concurrence."""
+        with self._lock:
+            if key in self.entries:
+                return self._hit(key)
+            key_lock = self._building.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self.entries:
+                    return self._hit(key)
+                self.misses += 1
+            try:
+                value = build()
+                self._store(key, value)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+            return _share(value)
+
+    def _hit(self, key):
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return _share(self.entries[key][0])
+
+    def _store(self, key, value):
+        size = nbytes(value)
+        if size > self.budget:
+            return
+        with self._lock:
+            self.entries[key] = (value, size)
+            self.used += size
+            while self.used > self.budget:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.used -= evicted
+                self.evictions += 1
+
+    def stats(self):
+        """Compteurs : entrées, mémoire utilisée et budget (Mo), succès, échecs, évictions."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entrées": len(self.entries),
+                "mémoire_mo": round(self.used / 1024 / 1024, 1),
+                "budget_mo": round(self.budget / 1024 / 1024, 1),
+                "succès": self.hits,
+                "échecs": self.misses,
+                "évictions": self.evictions,
+                "taux_succès": round(self.hits / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,288 @@
+"""Précalcul en tâche de fond des exports déposés dans un dossier surveillé.
+
+Chaque export reconnu est analysé une fois (table normalisée et résultats) et
+publié sous `<précalcul>/<jeu>/<empreinte>/` ; le fichier `current.json` du jeu
+désigne la dernière génération et n'est remplacé qu'une fois celle-ci écrite.
+
+Exemple :
+    python -m surveillance.watcher depot/ --interval 30
+"""
+import argparse
+import functools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from .batch import SUFFIXES, analyse
+from .loaders import (
+    PHENOTYPES,
+    SERVICE_LOG_PATH,
+    detect_kind,
+    file_digest,
+    guess_year,
+    percent_columns,
+    read_table,
+)
+from .services import load_service_index
+from .store import STORE_DIR, SurveillanceStore, append_tracked
+
+DROP_DIR = Path(os.environ.get("SURVEILLANCE_DROP_DIR", "data/depot"))
+WARM_DIR = Path(os.environ.get("SURVEILLANCE_WARM_DIR", "data/precalcul"))
+POLL_SECONDS = float(os.environ.get("SURVEILLANCE_DROP_INTERVAL", "30"))
+KEEP_GENERATIONS = 2
+
+Precomputed = namedtuple("Precomputed", ["meta", "table", "results"])
+
+
+def dataset_for(kind, name):
+    """Jeu de données de l'application correspondant à un export : None si non reconnu."""
+    if kind == "antibiotiques":
+        lowered = name.lower()
+        return "autres_antibiotiques" if "other" in lowered or "autre" in lowered else "antibiotiques"
+    return {"phenotypes": "phenotypes", "services": "isolats", "bacteries": "bacteries"}.get(kind)
+
+
+def _write_parquet(df, path):
+    if df is not None:
+        # colonnes object mixtes (texte et nombres) : Parquet exige un type unique ;
+        # le type "string" garde les valeurs manquantes au lieu d'écrire "None" / "nan"
+        mixed = [c for c in df.columns if df[c].dtype == object
+                 and df[c].map(type).nunique() > 1]
+        df.astype({c: "string" for c in mixed}).to_parquet(path)
+
+
+def _history_rows(kind, table, week_col, year):
+    """Lignes clés (Year, Week) et séries suivies d'un export, pour l'historique."""
+    if kind == "antibiotiques":
+        return table.assign(Year=year, Week=table[week_col]), percent_columns(table)
+    iso = pd.to_datetime(table["week"]).dt.isocalendar()
+    rows = table.assign(Year=iso["year"].astype(int), Week=iso["week"].astype(int))
+    return rows, [f"% {p}" for p in PHENOTYPES]
+
+
+def precompute(path, warm_dir=WARM_DIR, service_log=SERVICE_LOG_PATH, store=None):
+    """Analyse un export déposé et publie ses résultats ; renvoie le jeu mis à jour ou None.
+
+    Avec `store`, les semaines sont aussi versées dans l'historique, ce qui fait
+    avancer les états persistés des séries suivies.
+    """
+    path = Path(path)
+    digest = file_digest(path)
+    if _published(warm_dir, digest):
+        return None
+    df = read_table(path, path.name)
+    df.columns = df.columns.str.strip()
+    kind = detect_kind(df)
+    dataset = dataset_for(kind, path.name)
+    if dataset is None:
+        return None
+    folder = Path(warm_dir) / dataset
+
+    index = None
+    if service_log and os.path.exists(service_log) and kind in ("antibiotiques", "phenotypes"):
+        index = load_service_index(service_log)
+    year = guess_year(path.name, index.main_year() if index is not None else None)
+    table, week_col, results = analyse(df, kind, index, year)
+
+    generation = folder / digest[:16]
+    folder.mkdir(parents=True, exist_ok=True)
+    # répertoire temporaire propre à chaque écrivain (thread de l'application, autre processus)
+    tmp = Path(tempfile.mkdtemp(dir=folder, prefix=f".{digest[:16]}-", suffix=".tmp"))
+    try:
+        _write_parquet(table, tmp / "table.parquet")
+        _write_parquet(results, tmp / "resultats.parquet")
+        meta = {
+            "dataset": dataset,
+            "kind": kind,
+            "source": path.name,
+            "digest": digest,
+            "week_col": week_col,
+            "rows": len(table),
+            "computed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        # même empreinte, même contenu : une génération déjà publiée par un autre écrivain est gardée
+        if not generation.exists():
+            try:
+                os.replace(tmp, generation)
+            except OSError:
+                if not generation.exists():
+                    raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    fd, pointer = tempfile.mkstemp(dir=folder, prefix=".current-", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"digest": digest, "generation": generation.name}, f)
+    os.replace(pointer, folder / "current.json")
+    _prune(folder, generation.name)
+
+    if store is not None and kind in ("antibiotiques", "phenotypes"):
+        rows, cols = _history_rows(kind, table, week_col, year)
+        append_tracked(store, dataset, rows, cols)
+    elif store is not None and kind == "services":
+        store.append(dataset, table)
+    return dataset
+
+
+def _read_pointer(folder):
+    try:
+        return json.loads((Path(folder) / "current.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _published(warm_dir, digest):
+    """Vrai si ce contenu est déjà la génération courante d'un jeu de données."""
+    return any((_read_pointer(p.parent) or {}).get("digest") == digest
+               for p in Path(warm_dir).glob("*/current.json"))
+
+
+def _prune(folder, keep):
+    # la génération précédente reste disponible pour les lectures en cours
+    generations = sorted((p for p in folder.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                         key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in [g for g in generations if g.name != keep][KEEP_GENERATIONS - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_generation(generation):
+    generation = Path(generation)
+    meta = json.loads((generation / "meta.json").read_text(encoding="utf-8"))
+    table = pd.read_parquet(generation / "table.parquet")
+    results_path = generation / "resultats.parquet"
+    results = pd.read_parquet(results_path) if results_path.exists() else None
+    return Precomputed(meta, table, results)
+
+
+def latest(dataset, warm_dir=WARM_DIR):
+    """Dernière génération précalculée d'un jeu de données, None s'il n'y en a pas.
+
+    Les tables renvoyées sont partagées : ne pas les modifier en place.
+    """
+    folder = Path(warm_dir) / dataset
+    pointer = _read_pointer(folder)
+    if pointer is None:
+        return None
+    try:
+        return _load_generation(str(folder / pointer["generation"]))
+    except FileNotFoundError:
+        return None
+
+
+class DropFolderWatcher:
+    """Surveille un dossier de dépôt par scrutation et précalcule les exports nouveaux ou modifiés.
+
+    Un fichier récent n'est traité que lorsque sa taille et sa date de modification
+    sont restées stables entre deux passages, pour ne pas lire une copie en cours.
+    Un échec est noté dans `errors` et le fichier est repris au passage suivant.
+    """
+
+    def __init__(self, drop_dir=DROP_DIR, warm_dir=WARM_DIR, interval=POLL_SECONDS,
+                 service_log=SERVICE_LOG_PATH, store=None):
+        self.drop_dir = Path(drop_dir)
+        self.store = store
+        self.warm_dir = Path(warm_dir)
+        self.interval = interval
+        self.service_log = service_log
+        self.pending = {}
+        self.done = {}
+        self.errors = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def scan(self, settle=True):
+        """Un passage sur le dossier ; renvoie les jeux de données mis à jour."""
+        if not self.drop_dir.is_dir():
+            return []
+        files = {}
+        for path in self.drop_dir.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.suffix.lower() in SUFFIXES:
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+        updated = []
+        for path, signature in sorted(files.items(), key=lambda item: item[1]):
+            if self.done.get(path) == signature:
+                continue
+            recent = time.time() - signature[0] / 1e9 < self.interval
+            if settle and recent and self.pending.get(path) != signature:
+                self.pending[path] = signature
+                continue
+            self.pending.pop(path, None)
+            try:
+                dataset = precompute(path, self.warm_dir, self.service_log, self.store)
+            except Exception as e:
+                # copie en cours, fichier verrouillé... : nouvel essai au passage suivant
+                self.errors[path] = str(e)
+                continue
+            self.errors.pop(path, None)
+            self.done[path] = signature
+            if dataset:
+                updated.append(dataset)
+        return updated
+
+    def run(self):
+        while not self._stop.is_set():
+            self.scan()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Lance la surveillance dans un thread démon (une seule fois)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="surveillance-depot", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def _print_errors(watcher):
+    for path, error in watcher.errors.items():
+        print(f"{time.strftime('%H:%M:%S')} échec {path.name} : {error} (nouvel essai au prochain passage)",
+              file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Précalcul des exports déposés dans un dossier.")
+    parser.add_argument("drop_dir", nargs="?", default=DROP_DIR, help="dossier de dépôt surveillé")
+    parser.add_argument("-o", "--warm-dir", default=WARM_DIR, help="répertoire des résultats précalculés")
+    parser.add_argument("-s", "--services", default=SERVICE_LOG_PATH,
+                        help="journal des isolats par service pour les semaines de pic")
+    parser.add_argument("-i", "--interval", type=float, default=POLL_SECONDS, help="secondes entre deux passages")
+    parser.add_argument("--historique", default=STORE_DIR, help="historique multi-années alimenté par le dépôt")
+    parser.add_argument("--once", action="store_true", help="un seul passage puis arrêt")
+    args = parser.parse_args(argv)
+
+    watcher = DropFolderWatcher(args.drop_dir, args.warm_dir, args.interval, args.services,
+                                SurveillanceStore(args.historique))
+    if args.once:
+        print(", ".join(watcher.scan(settle=False)) or "aucun jeu mis à jour")
+        _print_errors(watcher)
+        sys.exit(1 if watcher.errors else 0)
+    try:
+        while True:
+            for dataset in watcher.scan():
+                print(f"{time.strftime('%H:%M:%S')} {dataset} précalculé")
+            _print_errors(watcher)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from surveillance.alerts import (
+    HIGH,
+    NORMAL,
+    RollingBands,
+    RollingIQR,
+    alert_matrix,
+    rolling_bounds,
+    rolling_status,
+    update_bands_persisted,
+)
+
+
+def weekly(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(10, 1, n)
+    values[5] = np.nan
+    return pd.DataFrame({"Year": 2024, "Week": np.arange(1, n + 1), "% R A": values})
+
+
+def test_rolling_iqr_matches_vectorized_bounds():
+    df = weekly()
+    lower, upper = rolling_bounds(df["% R A"])
+    engine = RollingIQR()
+    for i, value in enumerate(df["% R A"]):
+        lo, hi, _ = engine.update(value)
+        np.testing.assert_allclose([lo, hi], [lower.iloc[i], upper.iloc[i]], equal_nan=True)
+
+
+def test_rolling_band_ignores_judged_week_unlike_static_band():
+    df = weekly()
+    df.loc[df.index[-1], "% R A"] = 50.0
+    static = alert_matrix(df, "Week", ["% R A"])
+    rolling = rolling_status(df, ["% R A"])
+    # la semaine extrême élargit la bande statique mais pas la bande glissante
+    assert static.at["% R A", "Seuil haut"] > rolling.at["% R A", "Seuil glissant haut"]
+    assert rolling.at["% R A", "Statut glissant"] == HIGH
+
+
+def test_bands_resume_after_save_and_load(tmp_path):
+    df = weekly()
+    full = RollingBands()
+    full.run(df, ["% R A"], ["Year", "Week"])
+
+    first = RollingBands()
+    first.run(df.iloc[:25], ["% R A"], ["Year", "Week"])
+    first.save(tmp_path / "a.json")
+    resumed = RollingBands.load(tmp_path / "a.json")
+    assert resumed.run(df, ["% R A"], ["Year", "Week"]) == 15
+
+    assert resumed.last_key == full.last_key == (2024, 40)
+    pd.testing.assert_frame_equal(resumed.status(), full.status())
+
+
+def test_out_of_order_weeks_rebuild_from_history(tmp_path):
+    df = weekly()
+    update_bands_persisted("ab", df.iloc[20:], ["% R A"], root=tmp_path)
+    with pytest.raises(ValueError):
+        update_bands_persisted("ab", df.iloc[:20], ["% R A"], root=tmp_path)
+
+    bands, rebuilt = update_bands_persisted("ab", df.iloc[:20], ["% R A"], root=tmp_path, history=lambda: df)
+    assert rebuilt
+    expected = RollingBands()
+    expected.run(df, ["% R A"], ["Year", "Week"])
+    pd.testing.assert_frame_equal(bands.status(), expected.status())
+    assert bands.status().at["% R A", "Statut glissant"] == NORMAL
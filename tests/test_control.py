@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from surveillance.control import ControlChart, drift_chart, load_chart, update_persisted
+
+
+def weekly(n=30, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"Year": 2024, "Week": np.arange(1, n + 1),
+                       "% OXA": rng.normal(10, 1, n), "% VAN": rng.normal(5, 0.5, n)})
+    df.loc[n - 3:, "% OXA"] += 6
+    df.loc[4, "% VAN"] = np.nan
+    return df
+
+
+COLS = ["% OXA", "% VAN"]
+
+
+def last_signals(result):
+    """Référence : derniers signaux relus dans le résultat complet de `run`."""
+    ewma = result["ewma"]
+    last = ewma.notna()[::-1].idxmax()
+    pick = lambda stat: pd.Series({col: result.at[last[col], (stat, col)] for col in ewma.columns})
+    table = pd.DataFrame({
+        "EWMA": pick("ewma"),
+        "Limite EWMA": pick("ewma_haut"),
+        "CUSUM +": pick("cusum_haut"),
+        "Alerte EWMA": pick("alerte_ewma").astype(bool),
+        "Alerte CUSUM": pick("alerte_cusum").astype(bool),
+        "Semaines en alerte": (result["alerte_ewma"] | result["alerte_cusum"]).sum(),
+    })
+    table.index.name = "Série"
+    return table.sort_values(["Alerte CUSUM", "Alerte EWMA", "CUSUM +"], ascending=False)
+
+
+def test_update_matches_run():
+    df = weekly()
+    result = ControlChart(COLS).run(df, COLS)
+    chart = ControlChart(COLS)
+    for row in df[COLS].to_numpy():
+        stats = chart.update(row)
+    np.testing.assert_allclose(stats["ewma"], result["ewma"].iloc[-1].to_numpy())
+    np.testing.assert_allclose(stats["cusum_haut"], result["cusum_haut"].iloc[-1].to_numpy())
+
+
+def test_resume_after_save_and_load_matches_a_single_run(tmp_path):
+    df = weekly()
+    whole = ControlChart(COLS)
+    whole.run(df, COLS, ["Year", "Week"])
+
+    update_persisted("antibiotiques", df.iloc[:12], COLS, root=tmp_path)
+    update_persisted("antibiotiques", df.iloc[12:], COLS, root=tmp_path)
+    resumed = load_chart("antibiotiques", tmp_path)
+
+    assert resumed.last_key == (2024, 30)
+    pd.testing.assert_frame_equal(resumed.status(), whole.status())
+    pd.testing.assert_frame_equal(resumed.signals(COLS), whole.signals(COLS))
+    pd.testing.assert_frame_equal(whole.signals(COLS), last_signals(ControlChart(COLS).run(df, COLS)),
+                                  check_dtype=False)
+
+
+def test_drift_chart_only_adds_newer_weeks_and_does_not_save(tmp_path):
+    df = weekly()
+    update_persisted("phenotypes", df.iloc[:20], COLS, root=tmp_path)
+
+    chart = drift_chart(load_chart("phenotypes", tmp_path), df, COLS)
+    expected = ControlChart(COLS)
+    expected.run(df, COLS, ["Year", "Week"])
+
+    pd.testing.assert_frame_equal(chart.signals(COLS), expected.signals(COLS))
+    assert load_chart("phenotypes", tmp_path).last_key == (2024, 20)
+
+
+def test_out_of_order_weeks_rebuild_from_history_or_are_rejected(tmp_path):
+    df = weekly()
+    update_persisted("antibiotiques", df.iloc[10:], COLS, root=tmp_path)
+
+    with pytest.raises(ValueError):
+        update_persisted("antibiotiques", df.iloc[:10], COLS, root=tmp_path)
+    assert load_chart("antibiotiques", tmp_path).last_key == (2024, 30)
+
+    chart, rebuilt = update_persisted("antibiotiques", df.iloc[:10], COLS, root=tmp_path, history=lambda: df)
+    assert rebuilt
+    expected = ControlChart(COLS)
+    expected.run(df, COLS, ["Year", "Week"])
+    pd.testing.assert_frame_equal(load_chart("antibiotiques", tmp_path).status(), expected.status())
+
+
+def test_legacy_state_is_rebuilt_from_history(tmp_path):
+    df = weekly()
+    update_persisted("antibiotiques", df.iloc[:20], COLS, root=tmp_path)
+    with np.load(tmp_path / "antibiotiques.npz") as data:
+        state = dict(data)
+    # ancien format : noms enregistrés en tableau d'objets
+    np.savez(tmp_path / "antibiotiques.npz", **{**state, "names": np.array(COLS, dtype=object)})
+
+    assert load_chart("antibiotiques", tmp_path) is None
+    with pytest.raises(ValueError):
+        update_persisted("antibiotiques", df.iloc[20:], COLS, root=tmp_path)
+    _, rebuilt = update_persisted("antibiotiques", df.iloc[20:], COLS, root=tmp_path, history=lambda: df)
+    assert rebuilt and load_chart("antibiotiques", tmp_path).last_key == (2024, 30)
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from surveillance.cube import ResistanceCube, antibiotic_columns
+
+
+def test_only_sir_columns_are_counted():
+    df = pd.DataFrame({"Year": [2024, 2024], "Week": [1, 1], "LIBELLE_DEMANDEUR": ["A", "B"],
+                       "AGE": [50, 60], "SEXE": ["M", "F"], "OXA": ["R ", " s"], "VAN": [None, "S"]})
+
+    assert antibiotic_columns(df) == ["OXA", "VAN"]
+    cube = ResistanceCube.from_isolates(df)
+    assert cube.tested.sum().to_dict() == {"OXA": 2, "VAN": 1}
+    assert cube.resistant.sum().to_dict() == {"OXA": 1, "VAN": 0}
+
+
+def test_stray_codes_keep_the_antibiotic_but_are_not_tests():
+    df = pd.DataFrame({"Year": 2024, "Week": [1, 1, 1, 2], "LIBELLE_DEMANDEUR": "A",
+                       "CLINDAMYCINE": ["R", "F", "S", "R"], "CODE": ["F", "F", "S", "X"]})
+
+    assert antibiotic_columns(df) == ["CLINDAMYCINE"]
+    cube = ResistanceCube.from_isolates(df)
+    assert cube.tested["CLINDAMYCINE"].tolist() == [2, 1]
+    assert cube.resistant["CLINDAMYCINE"].tolist() == [1, 1]
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from surveillance import loaders
+
+
+def test_new_service_log_snapshot_replaces_the_previous_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(loaders, "CACHE_DIR", tmp_path / "cache")
+    log = tmp_path / "journal.csv"
+    other = tmp_path / "cache" / "journal-bis-0123456789abcdef.parquet"
+    other.parent.mkdir()
+    other.write_bytes(b"")
+
+    for dates in (["2024-01-02"], ["2024-01-02", "2024-01-09"]):
+        pd.DataFrame({"DATE_ENTREE": dates, "LIBELLE_DEMANDEUR": "A"}).to_csv(log, index=False)
+        df = loaders.load_service_log(log)
+
+    assert df["Week"].tolist() == [1, 2]
+    snapshots = {p.name for p in (tmp_path / "cache").iterdir()}
+    assert snapshots == {other.name, loaders._snapshot_path(log, loaders.file_digest(log)).name}
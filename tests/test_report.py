@@ -0,0 +1,62 @@
+import argparse
+from itertools import zip_longest
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from surveillance.alerts import HIGH
+from surveillance.report import Section, _parse_week, write_report
+from surveillance.services import WeekServiceIndex
+
+
+def test_parse_week():
+    assert _parse_week("2024-07") == (2024, 7)
+    assert _parse_week("2024S52") == (2024, 52)
+    for text in ("2024-xx", "24-07", "2024-60"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            _parse_week(text)
+
+
+def sheet_rows(wb, name):
+    # la lecture seule tronque les cellules vides en fin de ligne
+    rows = list(wb[name].iter_rows(values_only=True))
+    return [dict(zip_longest(rows[0], row)) for row in rows[1:]]
+
+
+def test_write_report(tmp_path):
+    values = 10 + np.tile([0.0, 0.5, -0.5, 0.2], 5)
+    values[-1] = 30.0
+    weekly = pd.DataFrame({"Semaine": np.arange(1, 21), "% OXA": values, "% VAN": np.nan})
+    dates = pd.date_range("2023-12-25", periods=20, freq="W-MON")
+    pheno = pd.DataFrame({"Week": dates, "% MRSA": values})
+    log = pd.DataFrame({"Year": [2024, 2023], "Week": [20, 20], "LIBELLE_DEMANDEUR": ["Réa", "Autre année"]})
+    sections = [Section("Antibiotiques", weekly, "Semaine", ["% OXA", "% VAN"], 2024, "Résistance (%)"),
+                Section("Phénotypes", pheno, "Week", ["% MRSA"], None, "Part (%)")]
+
+    path = write_report(tmp_path, sections, WeekServiceIndex.from_service_log(log),
+                        start=(2024, 10), end=(2024, 20), html_charts=False)
+    wb = load_workbook(path, read_only=True)
+
+    series = sheet_rows(wb, "Antibiotiques")
+    oxa = [r for r in series if r["Série"] == "% OXA"]
+    assert [r["Semaine"] for r in oxa] == list(range(10, 21))
+    assert {r["Année"] for r in oxa} == {2024} and oxa[0]["Date"] is None
+    assert oxa[-1]["Statut"] == HIGH and oxa[-1]["Valeur"] == 30.0
+
+    # semaines ISO tirées des dates : la première (2023-S52) est hors plage
+    mrsa = sheet_rows(wb, "Phénotypes")
+    assert (mrsa[0]["Année"], mrsa[0]["Semaine"]) == (2024, 10)
+    assert (mrsa[-1]["Année"], mrsa[-1]["Semaine"]) == (2024, 19)
+
+    alerts = sheet_rows(wb, "Alertes services")
+    assert [(r["Jeu"], r["Série"], r["Semaine"], r["Service"], r["Isolats"]) for r in alerts] == [
+        ("Antibiotiques", "% OXA", 20, "Réa", 1)]
+
+    summary = {(r["Jeu"], r["Série"]): r for r in sheet_rows(wb, "Résumé")}
+    assert summary[("Antibiotiques", "% OXA")]["Semaines"] == 11
+    assert summary[("Antibiotiques", "% OXA")]["Semaines en alerte"] == sum(r["Statut"] == HIGH for r in oxa)
+    assert summary[("Antibiotiques", "% VAN")]["Semaines"] == 0
+    assert summary[("Antibiotiques", "% VAN")]["Statut"] is None
+    assert not (tmp_path / "graphiques").exists()
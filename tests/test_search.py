@@ -0,0 +1,32 @@
+import pandas as pd
+
+from surveillance.search import CatalogueIndex, normalize
+
+
+def catalogue():
+    return CatalogueIndex(pd.DataFrame({
+        "Category": ["Staphylococcus aureus", "Staphylococcus epidermidis", "Escherichia coli", "Entérocoque"],
+        "Key Antibiotics": ["Oxacilline, Vancomycine", "Vancomycine", "Amoxicilline, Céfotaxime", "Vancomycine"],
+        "Other Antibiotics": [None, "Oxacilline", "Vancomycine", None],
+        "Phenotype": ["MRSA", None, "BLSE", "ERV"],
+    }))
+
+
+def test_typos_are_tolerated():
+    assert catalogue().search("staph aurues")[0] == "Staphylococcus aureus"
+    assert catalogue().search("eschrichia")[0] == "Escherichia coli"
+
+
+def test_accents_are_folded():
+    assert normalize("Céfotaxime, Entérocoque") == "cefotaxime enterocoque"
+    assert catalogue().search("enterocoque") == ["Entérocoque"]
+    assert catalogue().search("CÉFOTAXIME") == ["Escherichia coli"]
+
+
+def test_ranking_follows_field_weights():
+    # Vancomycine : antibiotique clé de trois fiches, secondaire d'une seule
+    assert catalogue().search("vancomycine")[-1] == "Escherichia coli"
+    # Oxacilline : clé pour S. aureus, secondaire pour S. epidermidis
+    assert catalogue().search("oxacilline") == ["Staphylococcus aureus", "Staphylococcus epidermidis"]
+    assert catalogue().search("") == list(catalogue().records)
+    assert catalogue().search("zzzz") == []
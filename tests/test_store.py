@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from surveillance.batch import _peak_services
+from surveillance.loaders import guess_year
+from surveillance.services import WeekServiceIndex
+from surveillance.store import SurveillanceStore
+
+
+def test_read_fills_columns_missing_from_older_partitions(tmp_path):
+    store = SurveillanceStore(tmp_path)
+    store.append("antibiotiques", pd.DataFrame({"Year": 2023, "Week": [51, 52], "% OXA": [1.0, 2.0]}))
+    store.append("antibiotiques", pd.DataFrame({"Year": 2024, "Week": [1, 2], "% OXA": [3.0, 4.0],
+                                                "% VAN": [5.0, 6.0]}))
+
+    df = store.read("antibiotiques", columns=["% OXA", "% VAN"])
+
+    assert list(df.columns) == ["Year", "Week", "% OXA", "% VAN"]
+    assert df["% OXA"].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert np.isnan(df["% VAN"].iloc[:2]).all()
+    assert df["% VAN"].iloc[2:].tolist() == [5.0, 6.0]
+
+
+def test_data_year_defaults_to_busiest_service_year():
+    log = pd.DataFrame({"Year": [2023, 2024, 2024], "Week": [10, 10, 11],
+                        "LIBELLE_DEMANDEUR": ["A", "B", "B"]})
+    index = WeekServiceIndex.from_service_log(log)
+
+    assert index.main_year() == 2024
+    assert guess_year("export.csv", index.main_year()) == 2024
+    assert guess_year("export_2023.csv", index.main_year()) == 2023
+    assert WeekServiceIndex.from_service_log(log.iloc[:0]).main_year() is None
+
+
+def test_peak_services_use_the_file_year():
+    log = pd.DataFrame({"Year": [2023, 2024], "Week": [10, 10], "LIBELLE_DEMANDEUR": ["A", "B"]})
+    index = WeekServiceIndex.from_service_log(log)
+
+    assert _peak_services(index, 10, 2023) == "A (1)"
+    assert _peak_services(index, 10, 2024) == "B (1)"
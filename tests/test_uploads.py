@@ -0,0 +1,61 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from surveillance.uploads import UploadCache, nbytes
+
+MB = 1024 * 1024
+
+
+def block(mb):
+    return np.zeros(int(mb * MB) // 8)
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = UploadCache(budget_mb=2.5)
+    for key in "abc":
+        cache.get(key, lambda: block(1))
+    assert cache.get("b", lambda: block(1)) is not None
+
+    stats = cache.stats()
+    assert list(cache.entries) == ["c", "b"]
+    assert cache.used <= cache.budget
+    assert (stats["succès"], stats["échecs"], stats["évictions"]) == (1, 3, 1)
+
+
+def test_over_budget_value_is_returned_but_not_kept():
+    cache = UploadCache(budget_mb=1)
+    value = cache.get("big", lambda: block(2))
+    assert len(value) == 2 * MB // 8
+    assert not cache.entries and cache.used == 0
+
+
+def test_callers_get_their_own_table():
+    cache = UploadCache()
+    first = cache.get("t", lambda: pd.DataFrame({"x": [1, 2]}))
+    first.loc[0, "x"] = 99
+    assert cache.get("t", lambda: None)["x"].tolist() == [1, 2]
+    assert nbytes(first) > 0
+
+
+def test_concurrent_misses_build_once():
+    cache = UploadCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return "valeur"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", build))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["valeur"] * 8
+    assert cache.stats()["échecs"] == 1 and cache.stats()["succès"] == 7
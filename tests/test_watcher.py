@@ -0,0 +1,81 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from surveillance import watcher
+from surveillance.alerts import load_bands
+from surveillance.control import load_chart
+from surveillance.store import SurveillanceStore, append_tracked
+from surveillance.watcher import DropFolderWatcher, latest, precompute
+
+SAMPLE = Path(__file__).resolve().parent.parent / "tests_par_semaine_antibiotiques_2024.csv"
+
+
+def run_threads(target, n=8):
+    errors = []
+
+    def wrapped(i):
+        try:
+            target(i)
+        except Exception as e:  # pragma: no cover - remonté par l'assertion
+            errors.append(e)
+
+    threads = [threading.Thread(target=wrapped, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_concurrent_appends_keep_every_week(tmp_path):
+    store = SurveillanceStore(tmp_path / "store")
+    rows = lambda i: pd.DataFrame({"Year": 2024, "Week": [i + 1], "% OXA": [float(i)]})
+
+    run_threads(lambda i: store.append("isolats", rows(i)))
+    assert sorted(store.read("isolats")["Week"]) == list(range(1, 9))
+    assert not list((tmp_path / "store" / "isolats").glob("*.tmp"))
+
+
+def test_concurrent_tracked_appends_share_one_state(tmp_path):
+    store = SurveillanceStore(tmp_path / "store")
+    rows = lambda i: pd.DataFrame({"Year": 2024, "Week": [i + 1], "% OXA": [float(i)]})
+
+    run_threads(lambda i: append_tracked(store, "antibiotiques", rows(i), ["% OXA"], tmp_path / "control"))
+    # chaque semaine est intégrée une fois, directement ou par recalcul depuis l'historique
+    assert load_chart("antibiotiques", tmp_path / "control").count.tolist() == [8]
+    assert load_bands("antibiotiques", tmp_path / "control").last_key == (2024, 8)
+
+
+def test_concurrent_precompute_of_the_same_export(tmp_path):
+    drop = tmp_path / "depot"
+    drop.mkdir()
+    export = drop / SAMPLE.name
+    export.write_bytes(SAMPLE.read_bytes())
+    warm = tmp_path / "precalcul"
+
+    run_threads(lambda i: precompute(export, warm, service_log=None), n=4)
+    assert latest("antibiotiques", warm).meta["source"] == SAMPLE.name
+    assert not [p for p in (warm / "antibiotiques").iterdir() if p.name.startswith(".")]
+
+
+def test_failed_exports_are_retried(tmp_path, monkeypatch):
+    drop = tmp_path / "depot"
+    drop.mkdir()
+    (drop / "export.csv").write_text("x\n1\n")
+    outcomes = [OSError("fichier verrouillé"), "antibiotiques"]
+
+    def flaky(*args):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(watcher, "precompute", flaky)
+    folder = DropFolderWatcher(drop, tmp_path / "precalcul")
+
+    assert folder.scan(settle=False) == []
+    assert list(folder.errors.values()) == ["fichier verrouillé"]
+    assert folder.scan(settle=False) == ["antibiotiques"]
+    assert folder.errors == {} and outcomes == []